@@ -0,0 +1 @@
+# -*- coding: utf8 -*-
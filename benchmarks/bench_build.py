@@ -0,0 +1,120 @@
+# -*- coding: utf8 -*-
+"""Benchmark of project builder on synthetic projects.
+
+Usage (from repository root):
+
+    python -m benchmarks.bench_build --sizes 100 1000 10000 -o bench.json
+
+Every build runs in a separate process to measure its peak RSS.
+"""
+from benchmarks.generator import generate_project
+from os.path import getsize, join
+import subprocess
+import argparse
+import tempfile
+import resource
+import shutil
+import json
+import time
+import sys
+import os
+
+
+MODES = ('import', 'static', 'cached')
+
+
+def run_build(project_path, mode, cache_dir):
+    """Build project in current process and return measurements"""
+    os.environ['NAGINI_BUILDING'] = 'true'
+    from nagini.builder.package import ProjectPackage
+    from nagini.builder.profiler import Profiler
+    from nagini.builder.cache import BuildCache
+
+    profiler = Profiler()
+    cache = BuildCache(cache_dir, project_path) if mode == 'cached' else None
+    package = ProjectPackage(project_path, cache=cache,
+                             static=mode == 'static', profiler=profiler)
+    package.progress_callback = lambda name, progress: None
+    start = time.time()
+    package.build(config={'server': {'host': 'localhost'}})
+    result = {
+        'wall': time.time() - start,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'zip_size': getsize(package.zip_path),
+        'files': len(package.files),
+        'phases': profiler.phases[package.name],
+    }
+    package.clear()
+    return result
+
+
+def bench(size, mode, args, root):
+    name = 'bench_%d' % size
+    project_path = join(root, name)
+    if not os.path.exists(project_path):
+        generate_project(root, name, modules=max(1, size // args.per_module),
+                         jobs=size, flows=max(1, size // args.per_flow),
+                         depth=args.depth, fan_in=args.fan_in,
+                         embedded=args.embedded, seed=args.seed)
+    cache_dir = join(root, 'cache')
+    if mode == 'cached':  # warm up cache
+        _run_child(project_path, mode, cache_dir)
+    result = _run_child(project_path, mode, cache_dir)
+    result.update({'jobs': size, 'mode': mode})
+    return result
+
+
+def _run_child(project_path, mode, cache_dir):
+    output = subprocess.check_output([
+        sys.executable, '-m', 'benchmarks.bench_build', '--child',
+        project_path, mode, cache_dir
+    ])
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        print json.dumps(run_build(*sys.argv[2:]))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 1000, 10000], help='Numbers of jobs')
+    parser.add_argument('--modes', nargs='+', default=list(MODES),
+                        choices=MODES, help='Builder modes')
+    parser.add_argument('--per-module', type=int, default=20,
+                        help='Jobs per module')
+    parser.add_argument('--per-flow', type=int, default=100,
+                        help='Jobs per flow')
+    parser.add_argument('--depth', type=int, default=10, help='DAG depth')
+    parser.add_argument('--fan-in', type=int, default=3,
+                        help='Requirements of each job')
+    parser.add_argument('--embedded', type=int, default=5,
+                        help='Number of embedded flows')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='nagini-bench-')
+    results = []
+    try:
+        print '{0:>8}{1:>10}{2:>12}{3:>14}{4:>14}'.format(
+            'jobs', 'mode', 'wall, s', 'peak RSS, MB', 'zip size, KB')
+        for size in args.sizes:
+            for mode in args.modes:
+                r = bench(size, mode, args, root)
+                results.append(r)
+                print '{0:>8}{1:>10}{2:>12.3f}{3:>14.1f}{4:>14.1f}'.format(
+                    size, mode, r['wall'], r['peak_rss_kb'] / 1024.0,
+                    r['zip_size'] / 1024.0)
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(root)
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(results, fd, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# -*- coding: utf8 -*-
+"""Benchmark of AzkabanClient against local fake Azkaban server.
+
+Usage (from repository root):
+
+    python -m benchmarks.bench_client --latency 0.005 -n 200 -o bench.json
+
+Server runs in a separate process, so it doesn't compete with client
+threads for GIL.
+"""
+from benchmarks.fake_azkaban import FakeAzkaban
+from multiprocessing.pool import ThreadPool
+from multiprocessing import Process, Queue
+from nagini.client import AzkabanClient
+import argparse
+import tempfile
+import json
+import time
+import sys
+import os
+
+
+BENCHMARKS = ('upload', 'execute', 'status', 'logs', 'wait')
+
+
+def _serve(queue, kwargs):
+    server = FakeAzkaban(**kwargs)
+    queue.put(server.url)
+    server.serve_forever()
+
+
+def start_server(**kwargs):
+    """Start fake server in child process
+
+    :return: process and url of server
+    :rtype: (Process, str)
+    """
+    queue = Queue()
+    process = Process(target=_serve, args=(queue, kwargs))
+    process.daemon = True
+    process.start()
+    return process, queue.get(timeout=10)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def measure(name, calls, workers, size=0):
+    """Run calls in thread pool and return measurements
+
+    :param str name: name of benchmark
+    :param list calls: functions without arguments
+    :param int workers: number of concurrent calls
+    :param int size: bytes transferred by every call
+    :rtype: dict
+    """
+    def timed(call):
+        start = time.time()
+        call()
+        return time.time() - start
+
+    pool = ThreadPool(workers)
+    try:
+        start = time.time()
+        latencies = pool.map(timed, calls)
+        wall = time.time() - start
+    finally:
+        pool.close()
+        pool.join()
+    return {
+        'name': name,
+        'workers': workers,
+        'ops': len(calls),
+        'wall': wall,
+        'ops_per_s': len(calls) / wall,
+        'mb_per_s': size * len(calls) / 1048576.0 / wall,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+    }
+
+
+def bench_upload(client, args, workers):
+    fd, zip_path = tempfile.mkstemp(prefix='nagini-bench-', suffix='.zip')
+    try:
+        with os.fdopen(fd, 'wb') as fo:
+            for _ in xrange(args.zip_size // (1 << 20) or 1):
+                fo.write(os.urandom(min(args.zip_size, 1 << 20)))
+        size = os.path.getsize(zip_path)
+        client.create_project('bench')
+        calls = [lambda: client.upload_project_zip('bench', zip_path)
+                 for _ in xrange(max(1, args.requests // 10))]
+        return measure('upload', calls, workers, size)
+    finally:
+        os.remove(zip_path)
+
+
+def bench_execute(client, args, workers):
+    client.create_project('bench')
+    if workers == 1:
+        calls = [lambda: client.execute_flow('bench', 'flow', {'n': '1'})
+                 for _ in xrange(args.requests)]
+        return measure('execute', calls, 1)
+    # One batch call, latency is latency of the whole batch
+    submissions = [('flow', {'n': str(n)}) for n in xrange(args.requests)]
+    result = measure('execute', [lambda: client.execute_flows(
+        'bench', submissions, max_in_flight=workers)], 1)
+    result.update({'workers': workers, 'ops': args.requests,
+                   'ops_per_s': args.requests / result['wall']})
+    return result
+
+
+def bench_status(client, args, workers):
+    exec_id = client.execute_flow('bench', 'flow')['execid']
+    calls = [lambda: client.get_execution_info(exec_id)
+             for _ in xrange(args.requests)]
+    return measure('status', calls, workers)
+
+
+def bench_logs(client, args, workers):
+    exec_id = client.execute_flow('bench', 'flow')['execid']
+    calls = [lambda: client.get_job_logs(exec_id, 'job_0')
+             for _ in xrange(max(1, args.requests // 10))]
+    return measure('logs', calls, workers, args.log_size)
+
+
+def bench_wait(client, args, workers):
+    exec_ids = [r['execid'] for r in client.execute_flows(
+        'bench', [('flow', {})] * args.requests, max_in_flight=workers)]
+    result = measure('wait', [lambda: client.wait_for_executions(
+        exec_ids, poll_interval=0.1)], 1)
+    result.update({'workers': workers, 'ops': len(exec_ids)})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS),
+                        choices=BENCHMARKS)
+    parser.add_argument('-n', '--requests', type=int, default=200,
+                        help='Number of requests of each benchmark')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 10],
+                        help='Numbers of concurrent requests')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Delay of every response of server in seconds')
+    parser.add_argument('--zip-size', type=int, default=8 << 20,
+                        help='Size of uploaded zip in bytes')
+    parser.add_argument('--log-size', type=int, default=4 << 20,
+                        help='Size of log of job in bytes')
+    parser.add_argument('--execution-time', type=float, default=1,
+                        help='Time of execution of flow in seconds')
+    parser.add_argument('-o', '--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    process, url = start_server(latency=args.latency, log_size=args.log_size,
+                                execution_time=args.execution_time)
+    results = []
+    try:
+        print '{0:>10}{1:>9}{2:>8}{3:>10}{4:>10}{5:>10}{6:>10}{7:>10}'.format(
+            'benchmark', 'workers', 'ops', 'wall, s', 'ops/s', 'MB/s',
+            'p50, ms', 'p95, ms')
+        for name in args.benchmarks:
+            for workers in args.workers:
+                client = AzkabanClient(url, pool_size=workers)
+                client.login('bench', 'bench')
+                r = globals()['bench_' + name](client, args, workers)
+                results.append(r)
+                print ('{name:>10}{workers:>9}{ops:>8}{wall:>10.3f}'
+                       '{ops_per_s:>10.1f}{mb_per_s:>10.1f}{p50_ms:>10.1f}'
+                       '{p95_ms:>10.1f}').format(**r)
+                sys.stdout.flush()
+    finally:
+        process.terminate()
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(results, fd, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
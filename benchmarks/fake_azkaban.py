@@ -0,0 +1,301 @@
+# -*- coding: utf8 -*-
+"""Local stand-in of Azkaban web server for benchmarks and tests.
+
+Only endpoints used by AzkabanClient are implemented. Uploaded zips are
+read and dropped, executions are finished after `execution_time` seconds
+and logs of jobs are synthetic.
+
+Usage (from repository root):
+
+    python -m benchmarks.fake_azkaban --port 8081 --latency 0.01
+"""
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+from threading import Thread, Lock
+from uuid import uuid4
+import argparse
+import json
+import time
+
+
+EXECUTOR_ACTIONS = ('executeFlow', 'getRunning', 'fetchexecflow',
+                    'fetchExecJobLogs', 'reloadExecutors')
+LOG_LINE = '%s INFO - Nagini: fake log line of job with some padding ....\n'
+
+
+class FakeAzkaban(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, log_size=1 << 20,
+                 jobs=10, execution_time=0):
+        """
+        :param str host: interface to listen
+        :param int port: port to listen, random free port by default
+        :param float latency: delay of every response in seconds
+        :param int log_size: size of log of every job in bytes
+        :param int jobs: number of jobs in every execution
+        :param float execution_time: time of execution of flow in seconds
+        """
+        HTTPServer.__init__(self, (host, port), FakeAzkabanHandler)
+        self.latency = latency
+        self.log_size = log_size
+        self.jobs = jobs
+        self.execution_time = execution_time
+        self.sessions = set()
+        self.projects = {}  # name -> number of uploaded versions
+        self.executions = {}  # exec id -> (project, flow, start time)
+        self.uploaded_bytes = 0
+        self.requests = 0
+        self.lock = Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address
+
+    def start(self):
+        self._thread = Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def expire_sessions(self):
+        """Forget all sessions like restarted server"""
+        with self.lock:
+            self.sessions.clear()
+
+    def log(self, exec_id, job_name):
+        """Return full log of job"""
+        line = LOG_LINE % job_name
+        return (line * (self.log_size // len(line) + 1))[:self.log_size]
+
+    def written_log(self, exec_id, job_name):
+        """Return part of log written by now, it grows while job runs"""
+        log = self.log(exec_id, job_name)
+        try:
+            n = int(job_name.rsplit('_', 1)[-1])
+        except ValueError:
+            return log
+        elapsed = time.time() - self.executions[exec_id][2]
+        job_time = float(self.execution_time) / self.jobs
+        job_end = self.execution_time * (n + 1) / self.jobs
+        if elapsed >= job_end:
+            return log
+        progress = max(0.0, (elapsed - job_end + job_time) / job_time)
+        return log[:int(len(log) * progress)]
+
+    def execution_info(self, exec_id):
+        project, flow, started = self.executions[exec_id]
+        elapsed = time.time() - started
+        finished = elapsed >= self.execution_time
+        nodes = []
+        for n in xrange(self.jobs):
+            # Jobs are run one after another
+            job_end = self.execution_time * (n + 1) / self.jobs
+            if finished or elapsed >= job_end:
+                status = 'SUCCEEDED'
+            elif elapsed >= job_end - float(self.execution_time) / self.jobs:
+                status = 'RUNNING'
+            else:
+                status = 'READY'
+            nodes.append({
+                'id': 'job_%d' % n,
+                'nestedId': 'job_%d' % n,
+                'status': status,
+                'startTime': int(started * 1000),
+                'endTime': int(started * 1000 + job_end * 1000)
+                if status == 'SUCCEEDED' else -1,
+                'type': 'command',
+                'attempt': 0,
+            })
+        return {
+            'execid': exec_id,
+            'project': project,
+            'flow': flow,
+            'flowId': flow,
+            'status': 'SUCCEEDED' if finished else 'RUNNING',
+            'submitTime': int(started * 1000),
+            'startTime': int(started * 1000),
+            'endTime': int((started + self.execution_time) * 1000)
+            if finished else -1,
+            'nodes': nodes,
+        }
+
+
+class FakeAzkabanHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep alive
+    # Headers and body are written separately, avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        params = dict((k, v[-1]) for k, v in parse_qs(url.query).iteritems())
+        content_type = self.headers.get('Content-Type', '')
+        # Only head of uploaded zip is kept, it has all form fields
+        body = self._read_body(
+            keep=1 << 16 if content_type.startswith('multipart') else None
+        )
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            params.update((k, v[-1]) for k, v in parse_qs(body).iteritems())
+
+        path = url.path.strip('/')
+        if path == '' and params.get('action') == 'login':
+            return self._respond(self._login(params))
+        if params.get('session.id') not in server.sessions:
+            return self._respond({'error': 'session'})
+
+        if path == 'manager':
+            if content_type.startswith('multipart/form-data'):
+                return self._respond(self._upload(body))
+            if params.get('delete') == 'true':
+                with server.lock:
+                    server.projects.pop(params.get('project'), None)
+                return self._respond({})
+            if params.get('action') == 'create':
+                with server.lock:
+                    server.projects.setdefault(params['name'], 0)
+                return self._respond({'status': 'success'})
+        elif path == 'executor' and params.get('ajax') in EXECUTOR_ACTIONS:
+            action = getattr(self, '_' + params['ajax'])
+            return self._respond(action(params))
+        self._respond({'error': 'Unknown request %s' % self.path}, 404)
+
+    def _read_body(self, keep=None):
+        length = int(self.headers.get('Content-Length') or 0)
+        chunks, size = [], 0
+        while size < length:
+            chunk = self.rfile.read(min(length - size, 1 << 16))
+            if not chunk:
+                break
+            if keep is None or size < keep:
+                chunks.append(chunk)
+            size += len(chunk)
+        with self.server.lock:
+            self.server.uploaded_bytes += size
+        return ''.join(chunks)
+
+    def _respond(self, data, code=200):
+        body = json.dumps(data)
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _login(self, params):
+        if not params.get('username'):
+            return {'error': 'Incorrect Login.'}
+        session_id = uuid4().hex
+        with self.server.lock:
+            self.server.sessions.add(session_id)
+        return {'status': 'success', 'session.id': session_id}
+
+    def _upload(self, body):
+        project = body.split('name="project"\r\n\r\n', 1)[-1].split('\r\n')[0]
+        with self.server.lock:
+            if project not in self.server.projects:
+                return {'error': 'Installation Failed. Project %s '
+                                 "doesn't exist." % project}
+            self.server.projects[project] += 1
+            version = self.server.projects[project]
+        return {'projectId': hash(project) & 0xffff, 'version': version}
+
+    def _executeFlow(self, params):
+        server = self.server
+        with server.lock:
+            if params.get('project') not in server.projects:
+                return {'error': 'Project %s does not exist'
+                                 % params.get('project')}
+            exec_id = len(server.executions) + 1
+            server.executions[exec_id] = (params['project'], params['flow'],
+                                          time.time())
+        return {'project': params['project'], 'flow': params['flow'],
+                'execid': exec_id,
+                'message': 'Execution submitted successfully with exec id %d'
+                           % exec_id}
+
+    def _getRunning(self, params):
+        server = self.server
+        with server.lock:
+            exec_ids = [
+                exec_id for exec_id, (project, flow, started)
+                in server.executions.iteritems()
+                if project == params.get('project') and
+                flow == params.get('flow') and
+                time.time() - started < server.execution_time
+            ]
+        return {'execIds': exec_ids} if exec_ids else {}
+
+    def _fetchexecflow(self, params):
+        exec_id = int(params.get('execid', 0))
+        if exec_id not in self.server.executions:
+            return {'error': 'Cannot find execution %d' % exec_id}
+        return self.server.execution_info(exec_id)
+
+    def _fetchExecJobLogs(self, params):
+        exec_id = int(params.get('execid', 0))
+        if exec_id not in self.server.executions:
+            return {'error': 'Cannot find execution %d' % exec_id}
+        log = self.server.written_log(exec_id, params.get('jobId'))
+        offset = int(params.get('offset', 0))
+        length = int(params.get('length', len(log)))
+        data = log[offset:offset + length]
+        return {'data': data, 'offset': offset, 'length': len(data)}
+
+    def _reloadExecutors(self, params):
+        return {'status': 'success'}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Delay of every response in seconds')
+    parser.add_argument('--log-size', type=int, default=1 << 20,
+                        help='Size of log of every job in bytes')
+    parser.add_argument('--jobs', type=int, default=10,
+                        help='Number of jobs in every execution')
+    parser.add_argument('--execution-time', type=float, default=0,
+                        help='Time of execution of flow in seconds')
+    args = parser.parse_args()
+
+    server = FakeAzkaban(args.host, args.port, args.latency, args.log_size,
+                         args.jobs, args.execution_time)
+    print 'Fake Azkaban is listening on', server.url
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
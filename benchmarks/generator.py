@@ -0,0 +1,127 @@
+# -*- coding: utf8 -*-
+"""Generator of synthetic nagini projects for benchmarks"""
+from os.path import join, exists
+from os import makedirs
+import random
+
+
+JOB_TEMPLATE = '''
+
+class {name}(BaseJob):
+    retries = 1
+
+    def requires(self):
+        return [{requires}]
+
+    def run(self):
+        pass
+'''
+
+FLOW_TEMPLATE = '''
+
+class {name}(BaseFlow):
+    def requires(self):
+        return [{requires}]
+'''
+
+EMBEDDED_TEMPLATE = '''
+
+class {name}(EmbeddedFlow):
+    name = '{name}'
+
+    def source_flow(self):
+        return {source}()
+'''
+
+
+def _layers(jobs, depth):
+    """Split job indexes to depth layers of nearly equal size"""
+    depth = max(1, min(depth, jobs))
+    size, extra = divmod(jobs, depth)
+    layers, start = [], 0
+    for n in xrange(depth):
+        end = start + size + (1 if n < extra else 0)
+        layers.append(range(start, end))
+        start = end
+    return layers
+
+
+def generate_project(root, name, modules=10, jobs=100, flows=1, depth=5,
+                     fan_in=2, embedded=0, seed=0):
+    """Write synthetic project to root/name
+
+    Jobs are split into `depth` layers, every job requires `fan_in` random
+    jobs of the previous layer, so fan-out of jobs grows as layers shrink.
+    Jobs of the last layer are split between flows. First `embedded` flows
+    besides the first one also require embedded flow of previous flow.
+
+    :param str root: directory to create project in
+    :param str name: name of project (must be valid python identifier)
+    :param int modules: number of modules with jobs
+    :param int jobs: number of jobs
+    :param int flows: number of flows
+    :param int depth: depth of DAG of jobs
+    :param int fan_in: number of requirements of each job
+    :param int embedded: number of embedded flows
+    :param int seed: seed of random generator
+    :return: path to project
+    :rtype: str
+    """
+    rnd = random.Random(seed)
+    path = join(root, name)
+    if not exists(path):
+        makedirs(path)
+    with open(join(path, '__init__.py'), 'w') as fd:
+        fd.write('')
+
+    modules = max(1, min(modules, jobs))
+    per_module = -(-jobs // modules)  # ceil
+    module_of = lambda i: 'jobs_%04d' % (i // per_module)
+    job_name = lambda i: 'Job%06d' % i
+
+    layers = _layers(jobs, depth)
+    requires = {}
+    for prev, layer in zip(layers, layers[1:]):
+        for i in layer:
+            requires[i] = rnd.sample(prev, min(fan_in, len(prev)))
+
+    for m in xrange(modules):
+        indexes = range(m * per_module, min((m + 1) * per_module, jobs))
+        imports = set()
+        for i in indexes:
+            for r in requires.get(i, []):
+                if module_of(r) != module_of(i):
+                    imports.add((module_of(r), job_name(r)))
+
+        lines = ['# -*- coding: utf8 -*-', 'from nagini import BaseJob']
+        lines += ['from %s.%s import %s' % (name, module, job)
+                  for module, job in sorted(imports)]
+        body = ''.join(
+            JOB_TEMPLATE.format(name=job_name(i), requires=', '.join(
+                '%s()' % job_name(r) for r in requires.get(i, [])
+            ))
+            for i in indexes
+        )
+        with open(join(path, 'jobs_%04d.py' % m), 'w') as fd:
+            fd.write('\n'.join(lines) + '\n' + body)
+
+    flows = max(1, flows)
+    last = layers[-1]
+    lines = ['# -*- coding: utf8 -*-',
+             'from nagini import BaseFlow, EmbeddedFlow']
+    body = []
+    for f in xrange(flows):
+        flow_jobs = last[f::flows] or last[-1:]
+        for i in flow_jobs:
+            lines.append('from %s.%s import %s' % (name, module_of(i),
+                                                     job_name(i)))
+        flow_requires = ['%s()' % job_name(i) for i in flow_jobs]
+        if 0 < f <= embedded:
+            body.append(EMBEDDED_TEMPLATE.format(name='Embedded%04d' % f,
+                                                 source='Flow%04d' % (f - 1)))
+            flow_requires.append('Embedded%04d()' % f)
+        body.append(FLOW_TEMPLATE.format(name='Flow%04d' % f,
+                                         requires=', '.join(flow_requires)))
+    with open(join(path, 'flows.py'), 'w') as fd:
+        fd.write('\n'.join(lines) + '\n' + ''.join(body))
+    return path
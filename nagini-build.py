@@ -1,10 +1,14 @@
 #!/usr/bin/python2
 # -*- coding: utf8 -*-
 from os.path import join, isdir
-from nagini.builder.package import PlainProjectPackage, ProjectPackage
+from nagini.builder.parallel import make_package, build_projects
+from nagini.builder.manifest import UploadManifest, zip_digest
+from multiprocessing.pool import ThreadPool
 from os import getcwd, listdir
+from nagini.builder.profiler import Profiler
 from nagini.client import AzkabanClient
 import argparse
+import time
 import sys
 import os
 
@@ -26,6 +30,29 @@ def main():
                         help='Username to authenticate on server')
     parser.add_argument('-P', '--password', dest='password', required=True,
                         help='Password to authenticate on server')
+    parser.add_argument('--cache-dir', dest='cache_dir',
+                        default='~/.cache/nagini',
+                        help='Directory for build cache')
+    parser.add_argument('--no-cache', dest='no_cache', default=False,
+                        action='store_true',
+                        help="Don't use build cache, rebuild all modules")
+    parser.add_argument('-s', '--static', dest='static', default=False,
+                        action='store_true',
+                        help='Find flows by parsing sources, import only '
+                             'modules which contain flows')
+    parser.add_argument('-f', '--force', dest='force', default=False,
+                        action='store_true',
+                        help='Upload projects even if they are not changed '
+                             'since last upload')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1,
+                        help='Number of worker processes to build projects')
+    parser.add_argument('-w', '--upload-workers', dest='upload_workers',
+                        type=int, default=1,
+                        help='Number of projects uploaded concurrently')
+    parser.add_argument('--profile', dest='profile', nargs='?', default=None,
+                        const='nagini-build-profile.json',
+                        help='Time build phases and write JSON report to '
+                             'PROFILE (default: %(const)s)')
     args = parser.parse_args()
 
     config = {
@@ -36,7 +63,8 @@ def main():
         }
     }
 
-    client = AzkabanClient(config["server"]["host"])
+    client = AzkabanClient(config["server"]["host"],
+                           pool_size=max(10, args.upload_workers))
     client.login(config["server"]["username"], config["server"]["password"])
 
     projects = []
@@ -48,23 +76,51 @@ def main():
     else:
         items = [args.root]
 
-    for root_path in items:
-        if isdir(root_path):
-            if args.plain:
-                project = PlainProjectPackage(root_path)
-            else:
-                project = ProjectPackage(root_path)
+    items = filter(isdir, items)
+    cache_dir = None if args.no_cache else args.cache_dir
+    profiler = Profiler() if args.profile else None
+
+    if args.jobs > 1:
+        projects = build_projects(items, config=config, plain=args.plain,
+                                  cache_dir=cache_dir, static=args.static,
+                                  profiler=profiler, jobs=args.jobs)
+    else:
+        for root_path in items:
+            project = make_package(root_path, args.plain, cache_dir,
+                                   args.static, profiler)
             project.build(config=config)
             projects.append(project)
 
-    print "Uploading projects:"
-    for item in projects:
-        sys.stdout.write("{0:<56}".format(item.name))
-        sys.stdout.flush()
+    manifest = UploadManifest(args.cache_dir, args.host)
+
+    def upload(item):
+        digest = zip_digest(item.zip_path)
+        if not args.force and manifest.is_uploaded(item.name, digest):
+            return item, digest, "SKIP"
+        start = time.time()
         client.upload_project_zip(item.name, item.zip_path)
-        sys.stdout.write("{0:>4}\n".format("OK"))
-        sys.stdout.flush()
-        item.clear()
+        if profiler is not None:
+            profiler.add(item.name, 'upload', time.time() - start)
+        return item, digest, "OK"
+
+    print "Uploading projects:"
+    pool = ThreadPool(args.upload_workers)
+    try:
+        for item, digest, status in pool.imap(upload, projects):
+            if status == "OK":
+                manifest.set_uploaded(item.name, digest)
+            sys.stdout.write("{0:<56}{1:>4}\n".format(item.name, status))
+            sys.stdout.flush()
+            item.clear()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if profiler is not None:
+        print
+        print profiler.report()
+        profiler.save(args.profile)
+        print "Profile saved to", args.profile
 
 
 if __name__ == "__main__":
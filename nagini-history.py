@@ -0,0 +1,90 @@
+#!/usr/bin/python2
+# -*- coding: utf8 -*-
+# Script that exports execution history to SQLite and shows slowest jobs
+from nagini.history import HistoryStore, HistoryExporter
+from nagini.client import AzkabanClient
+import argparse
+import time
+import sys
+
+
+def export(args):
+    client = AzkabanClient(args.host, pool_size=args.workers)
+    client.login(args.user, args.password)
+
+    def progress(exec_id):
+        sys.stdout.write("\rFetched up to {0}".format(exec_id))
+        sys.stdout.flush()
+
+    with HistoryStore(args.db) as store:
+        exporter = HistoryExporter(client, store, workers=args.workers,
+                                   batch_size=args.batch_size)
+        stored = exporter.export(args.start, args.end, args.max_missing,
+                                 progress)
+        print
+        print "Stored {0} executions, last exec id is {1}".format(
+            stored, store.last_exec_id)
+
+
+def durations(args):
+    since = None
+    if args.days:
+        since = int((time.time() - args.days * 86400) * 1000)
+    with HistoryStore(args.db) as store:
+        rows = store.job_durations(args.status, since)
+    print "{0:<64}{1:>8}{2:>10}{3:>10}{4:>10}".format(
+        "project/flow/job", "runs", "p50, s", "p95, s", "max, s")
+    for project, flow, job, runs, p50, p95, max_ in rows[:args.limit]:
+        print "{0:<64}{1:>8}{2:>10.1f}{3:>10.1f}{4:>10.1f}".format(
+            "/".join([project or "", flow or "", job]), runs, p50, p95, max_)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", dest="db", default="nagini-history.db",
+                        help="SQLite database file")
+    subparsers = parser.add_subparsers()
+
+    parser_export = subparsers.add_parser(
+        "export", help="Export executions, resume from last exported")
+    parser_export.set_defaults(func=export)
+    parser_export.add_argument('-H', '--host', dest='host', required=True,
+                               help='Azkaban web server')
+    parser_export.add_argument('-u', '--user', dest='user', required=True,
+                               help='Username to authenticate on server')
+    parser_export.add_argument('-P', '--password', dest='password',
+                               required=True,
+                               help='Password to authenticate on server')
+    parser_export.add_argument('--start', dest='start', type=int,
+                               default=None,
+                               help='First exec id (default: next after '
+                                    'last exported)')
+    parser_export.add_argument('--end', dest='end', type=int, default=None,
+                               help='Last exec id (default: until '
+                                    'MAX_MISSING missing executions in a row)')
+    parser_export.add_argument('--max-missing', dest='max_missing', type=int,
+                               default=100)
+    parser_export.add_argument('-w', '--workers', dest='workers', type=int,
+                               default=10, help='Number of concurrent requests')
+    parser_export.add_argument('--batch-size', dest='batch_size', type=int,
+                               default=100,
+                               help='Executions stored in one transaction')
+
+    parser_durations = subparsers.add_parser(
+        "durations", help="Show p50/p95 durations of slowest jobs")
+    parser_durations.set_defaults(func=durations)
+    parser_durations.add_argument('--status', dest='status',
+                                  default='SUCCEEDED',
+                                  help='Status of runs of jobs')
+    parser_durations.add_argument('--days', dest='days', type=float,
+                                  default=None,
+                                  help='Use only runs of last DAYS days')
+    parser_durations.add_argument('-n', '--limit', dest='limit', type=int,
+                                  default=50)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
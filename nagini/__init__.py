@@ -3,14 +3,16 @@ from nagini.job import BaseJob, UploadToMySqlJob, MySqlQueryJob
 from nagini.flow import BaseFlow, EmbeddedFlow
 from nagini.target import Target, LocalTarget
 from nagini.yaml_config import YamlConfig
+from nagini.yaml_cache import load_yaml
 from nagini.fields import *
 
 from os.path import exists
 import logging.config
 import logging
-import yaml
 
 
+__version__ = '0.26'
+
 __all__ = ['BaseJob', 'BaseFlow', 'EmbeddedFlow', 'Target', 'LocalTarget',
            'BaseField', 'StringField', 'RegexpField', 'DateField',
            'DateTimeField', 'StringMonthField', 'UnicodeField', 'IntField',
@@ -27,10 +29,9 @@ except ImportError:
 
 
 if exists('/etc/nagini.yml'):
-    with open('/etc/nagini.yml') as fd:
-        config = yaml.load(fd)
-        if 'logging' in config:
-            logging.config.dictConfig(config['logging'])
+    config = load_yaml('/etc/nagini.yml')
+    if config and 'logging' in config:
+        logging.config.dictConfig(config['logging'])
 
 
 logging.getLogger('nagini').addHandler(NullHandler())
@@ -0,0 +1,99 @@
+# -*- coding: utf8 -*-
+"""Non-blocking variant of AzkabanClient.
+
+Python 2 has no asyncio, so requests are made by a bounded pool of threads
+over one pooled HTTP session. Every API method returns
+multiprocessing.pool.AsyncResult immediately.
+"""
+from multiprocessing.pool import ThreadPool
+from nagini.client import AzkabanClient
+
+
+# Methods of AzkabanClient available in AsyncAzkabanClient
+ASYNC_METHODS = ('login', 'delete_project', 'create_project',
+                 'upload_project_zip', 'execute_flow', 'execute_flows',
+                 'get_running_executions', 'get_execution_info',
+                 'get_job_logs', 'get_job_status', 'wait_for_executions',
+                 'reload_executors')
+
+
+class AsyncAzkabanClient(object):
+    """AzkabanClient which methods return AsyncResult instead of waiting
+    for response. Every method also takes `callback` keyword argument
+    which is called with result in a thread of the pool.
+
+    Example::
+
+        client = AsyncAzkabanClient('http://azkaban:8081', max_connections=50)
+        client.login('user', 'password').get()
+        pending = [client.get_execution_info(i) for i in exec_ids]
+        infos = client.gather(pending, timeout=60)
+    """
+
+    def __init__(self, host, max_connections=20, **kwargs):
+        """
+        :param str host: url of Azkaban web server
+        :param int max_connections: max number of concurrent requests and
+        kept alive connections
+        :param kwargs: other arguments of AzkabanClient
+        """
+        self.client = AzkabanClient(host, pool_size=max_connections, **kwargs)
+        self._pool = ThreadPool(max_connections)
+
+    @property
+    def host(self):
+        return self.client.host
+
+    @property
+    def session_id(self):
+        return self.client.session_id
+
+    def map(self, method, args_list, callback=None):
+        """Call method for each tuple of arguments
+
+        :param str method: name of method of AzkabanClient
+        :param list[tuple] args_list: arguments of each call
+        :rtype: list[multiprocessing.pool.AsyncResult]
+        """
+        return [getattr(self, method)(*args, callback=callback)
+                for args in args_list]
+
+    @staticmethod
+    def gather(results, timeout=None):
+        """Wait for all results and return their values in the same order.
+        Exception of the first failed call is raised.
+
+        :param list[multiprocessing.pool.AsyncResult] results:
+        :param float timeout: timeout of waiting for each result
+        :rtype: list
+        """
+        return [r.get(timeout) for r in results]
+
+    def close(self):
+        """Wait for pending requests, stop threads and close connections"""
+        self._pool.close()
+        self._pool.join()
+        self.client.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _async_method(name):
+    sync_method = getattr(AzkabanClient, name)
+
+    def method(self, *args, **kwargs):
+        callback = kwargs.pop('callback', None)
+        return self._pool.apply_async(getattr(self.client, name), args,
+                                      kwargs, callback)
+
+    method.__name__ = name
+    method.__doc__ = sync_method.__doc__
+    return method
+
+
+for _name in ASYNC_METHODS:
+    setattr(AsyncAzkabanClient, _name, _async_method(_name))
@@ -0,0 +1,129 @@
+# -*- coding: utf8 -*-
+from os.path import join, relpath, splitext
+from multiprocessing.pool import ThreadPool
+from multiprocessing import cpu_count
+from collections import deque
+from os import walk, stat
+import zipfile
+import struct
+import time
+import zlib
+
+
+# Files which are compressed already are stored as is
+STORED_EXTENSIONS = frozenset([
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.jar', '.egg', '.whl',
+    '.png', '.jpg', '.jpeg', '.gif', '.parquet', '.snappy'
+])
+# Files larger than this are compressed by stream in the main thread to
+# keep memory usage bounded
+LARGE_FILE_SIZE = 32 * 1024 * 1024
+
+
+class ZipWriter(zipfile.ZipFile):
+    def write_compressed(self, zinfo, data):
+        """Write member which data is already compressed according to
+        zinfo.compress_type. zinfo must have file_size and CRC set.
+        """
+        zinfo.compress_size = len(data)
+        zinfo.header_offset = self.fp.tell()
+        self._writecheck(zinfo)
+        self._didModify = True
+        zip64 = (zinfo.file_size > zipfile.ZIP64_LIMIT or
+                 zinfo.compress_size > zipfile.ZIP64_LIMIT)
+        if zip64 and not self._allowZip64:
+            raise zipfile.LargeZipFile('Filesize would require ZIP64 '
+                                       'extensions')
+        self.fp.write(zinfo.FileHeader(zip64))
+        self.fp.write(data)
+        if zinfo.flag_bits & 0x08:
+            self.fp.write(struct.pack('<LLL', zinfo.CRC, zinfo.compress_size,
+                                      zinfo.file_size))
+        self.filelist.append(zinfo)
+        self.NameToInfo[zinfo.filename] = zinfo
+
+
+def _compress_type(arcname):
+    if splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _make_info(arcname, path=None):
+    if path is None:
+        zinfo = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        zinfo.external_attr = 0644 << 16
+    else:
+        st = stat(path)
+        date_time = time.localtime(max(st.st_mtime, 315532800))[:6]
+        zinfo = zipfile.ZipInfo(arcname, date_time)
+        zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.compress_type = _compress_type(arcname)
+    return zinfo
+
+
+def _compress(zinfo, path, content):
+    if path is not None:
+        with open(path, 'rb') as fd:
+            content = fd.read()
+    elif isinstance(content, unicode):
+        content = content.encode('utf8')
+
+    zinfo.file_size = len(content)
+    zinfo.CRC = zlib.crc32(content) & 0xffffffff
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                      zlib.DEFLATED, -15)
+        content = compressor.compress(content) + compressor.flush()
+    return zinfo, content
+
+
+def project_entries(project_path, name):
+    """Yield (arcname, path) for every file of project
+
+    :param str project_path: path to project directory
+    :param str name: name of project directory inside archive
+    """
+    for dir_path, _, filenames in walk(project_path, followlinks=True):
+        for filename in sorted(filenames):
+            path = join(dir_path, filename)
+            yield join(name, relpath(path, project_path)), path
+
+
+def write_zip(zip_path, entries, files=None, workers=None):
+    """Write zip archive from files on disk and generated content.
+    Members are compressed by pool of threads.
+
+    :param str zip_path: path to result archive
+    :param list[(str, str)] entries: pairs of (arcname, path to file)
+    :param dict[str,str] files: generated files, arcname -> content
+    :param int workers: number of compressing threads, cpu count by default
+    """
+    members = [(arcname, path, None) for arcname, path in entries]
+    members += [(arcname, None, content)
+                for arcname, content in sorted((files or {}).iteritems())]
+    workers = max(min(workers or cpu_count(), len(members)), 1)
+
+    pool = ThreadPool(workers)
+    pending = deque()
+    try:
+        with ZipWriter(zip_path, 'w', zipfile.ZIP_DEFLATED,
+                       allowZip64=True) as zf:
+            for arcname, path, content in members:
+                zinfo = _make_info(arcname, path)
+                if path is not None and stat(path).st_size > LARGE_FILE_SIZE:
+                    while pending:
+                        zf.write_compressed(*pending.popleft().get())
+                    zf.write(path, arcname, zinfo.compress_type)
+                    continue
+
+                pending.append(pool.apply_async(_compress,
+                                                (zinfo, path, content)))
+                if len(pending) >= workers * 2:
+                    zf.write_compressed(*pending.popleft().get())
+
+            while pending:
+                zf.write_compressed(*pending.popleft().get())
+    finally:
+        pool.terminate()
+        pool.join()
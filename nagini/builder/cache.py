@@ -0,0 +1,151 @@
+# -*- coding: utf8 -*-
+from os.path import (join, exists, isabs, abspath, basename, dirname,
+                     expanduser)
+from nagini.builder.templates import templates_hash
+from nagini import __version__
+from os import makedirs, rename
+import hashlib
+import logging
+import json
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT = 3
+
+
+def file_hash(path):
+    """Return sha1 digest of file content or None if file does not exist
+
+    :param str path: path to file
+    :rtype: str|None
+    """
+    if not exists(path):
+        return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CacheEntry(object):
+    """Outputs which one module contributes to the project build"""
+
+    def __init__(self, module_path, content_hash):
+        self.module_path = module_path
+        self.hash = content_hash
+        self.flows = []
+        self.files = {}
+        self.jobs = {}
+        self.deps = {}
+
+    def add_file(self, filename, content, source_files=()):
+        self.files[filename] = content
+        self.add_dependencies(source_files)
+
+    def add_job(self, name, target, source_files=()):
+        self.jobs[name] = target
+        self.add_dependencies(source_files)
+
+    def add_dependencies(self, source_files):
+        """Entry is invalid if any of these modules is changed"""
+        for source_file in source_files:
+            if source_file and source_file != self.module_path:
+                self.deps[source_file] = None
+
+    def to_dict(self):
+        return {'hash': self.hash, 'flows': self.flows, 'files': self.files,
+                'jobs': self.jobs, 'deps': self.deps}
+
+
+class BuildCache(object):
+    """Persistent per-module cache of generated project files.
+
+    Entry of module is valid while content of module and content of all
+    modules which classes take part in DAG of its flows are not changed.
+    Whole cache is dropped when nagini version or templates are changed.
+    """
+
+    def __init__(self, cache_dir, project_path):
+        project_path = abspath(project_path)
+        self.filename = join(
+            expanduser(cache_dir), 'build', '%s-%s.json' % (
+                basename(project_path),
+                hashlib.sha1(project_path).hexdigest()[:8]
+            )
+        )
+        self.key = {'format': CACHE_FORMAT, 'nagini': __version__,
+                    'templates': templates_hash()}
+        self.base_dir = None
+        self.modules = {}
+        self._hashes = {}
+        self._load()
+
+    def _load(self):
+        self.modules = {}
+        if not exists(self.filename):
+            return
+        try:
+            with open(self.filename) as fd:
+                data = json.load(fd)
+        except ValueError:
+            logger.warning('Build cache %s is corrupted, ignore it',
+                           self.filename)
+            return
+        if data.get('key') == self.key:
+            self.modules = data.get('modules', {})
+
+    def scan(self, base_dir, module_paths):
+        """Calculate hashes of project modules
+
+        :param str base_dir: directory which module paths are relative to
+        :param list[str] module_paths: relative paths of project modules
+        """
+        self.base_dir = base_dir
+        self._hashes = {}
+        for module_path in module_paths:
+            self._hashes[module_path] = self.hash(module_path)
+
+        for module_path in self.modules.keys():
+            if module_path not in self._hashes:
+                del self.modules[module_path]
+
+    def hash(self, path):
+        if path not in self._hashes:
+            if isabs(path):
+                self._hashes[path] = file_hash(path)
+            else:
+                self._hashes[path] = file_hash(join(self.base_dir, path))
+        return self._hashes[path]
+
+    def get(self, module_path):
+        """Return valid cache entry of module or None
+
+        :param str module_path: relative path of module
+        :rtype: dict|None
+        """
+        entry = self.modules.get(module_path)
+        if entry is None or entry['hash'] != self.hash(module_path):
+            return None
+        for path, content_hash in entry['deps'].iteritems():
+            if content_hash != self.hash(path):
+                return None
+        return entry
+
+    def new_entry(self, module_path):
+        return CacheEntry(module_path, self.hash(module_path))
+
+    def commit(self, entry):
+        for path in entry.deps:
+            entry.deps[path] = self.hash(path)
+        self.modules[entry.module_path] = entry.to_dict()
+
+    def save(self):
+        cache_dir = dirname(self.filename)
+        if not exists(cache_dir):
+            makedirs(cache_dir)
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as fd:
+            json.dump({'key': self.key, 'modules': self.modules}, fd)
+        rename(tmp_filename, self.filename)
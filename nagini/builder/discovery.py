@@ -0,0 +1,249 @@
+# -*- coding: utf8 -*-
+"""Static discovery of flows: find subclasses of BaseFlow by parsing
+sources of project modules, without importing them.
+"""
+from os.path import join, relpath
+from nagini.loader import path_to_import, remove_ext
+from nagini.flow import BaseFlow, EmbeddedFlow
+from nagini.job import BaseJob
+from os import walk
+import ast
+
+
+FLOW = 'flow'
+EMBEDDED_FLOW = 'embedded'
+JOB = 'job'
+
+
+class ModuleInfo(object):
+    """Classes and imported names of one parsed module"""
+
+    def __init__(self, name, path, is_package=False):
+        self.name = name
+        self.path = path
+        self.is_package = is_package
+        self.package = name if is_package else name.rpartition('.')[0]
+        self.classes = {}  # class name -> list of base expressions
+        self.names = {}  # local name -> ('module', mod) | ('attr', mod, name)
+        self.star_imports = []
+        self.absolute_import = False
+        self.body = []
+
+
+def _attribute_chain(node):
+    """Return ['a', 'b', 'C'] for expression a.b.C or None"""
+    chain = []
+    while isinstance(node, ast.Attribute):
+        chain.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        chain.append(node.id)
+        return list(reversed(chain))
+    return None
+
+
+class StaticFlowFinder(object):
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.modules = {}
+        self._kinds = {}
+
+    def scan(self, path=''):
+        """Parse all modules placed in path
+
+        :param str path: directory relative to base_dir
+        """
+        for dir_path, _, filenames in walk(join(self.base_dir, path)):
+            for filename in filenames:
+                if not filename.endswith('.py'):
+                    continue
+                if filename.endswith('Launcher.py'):
+                    continue
+                path = relpath(join(dir_path, filename), self.base_dir)
+                self.parse(path)
+
+        # Names are resolved when all modules are known because of
+        # implicit relative imports
+        for info in self.modules.itervalues():
+            for node in info.body:
+                self._parse_node(info, node)
+        return self
+
+    def parse(self, path):
+        if path.endswith('__init__.py'):
+            name = path_to_import(remove_ext(path, 'py').rsplit('/', 1)[0])
+            info = ModuleInfo(name, path, is_package=True)
+        else:
+            info = ModuleInfo(path_to_import(path), path)
+
+        with open(join(self.base_dir, path)) as fd:
+            info.body = ast.parse(fd.read(), path).body
+        self.modules[info.name] = info
+
+    def _parse_node(self, info, node):
+        if isinstance(node, ast.ClassDef):
+            info.classes[node.name] = node.bases
+            info.names.pop(node.name, None)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module == '__future__':
+                if any(a.name == 'absolute_import' for a in node.names):
+                    info.absolute_import = True
+                return
+            module = self._import_from_module(info, node)
+            for alias in node.names:
+                if alias.name == '*':
+                    info.star_imports.append(module)
+                else:
+                    info.names[alias.asname or alias.name] = (
+                        'attr', module, alias.name
+                    )
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                module = self._absolute_name(info, alias.name)
+                if alias.asname:
+                    info.names[alias.asname] = ('module', module)
+                else:
+                    head = alias.name.split('.')[0]
+                    info.names[head] = (
+                        'module', self._absolute_name(info, head)
+                    )
+        elif isinstance(node, (ast.If, ast.TryExcept, ast.TryFinally)):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.stmt):
+                    self._parse_node(info, child)
+
+    def _import_from_module(self, info, node):
+        if node.level:
+            parts = info.package.split('.')
+            if node.level > 1:
+                parts = parts[:-(node.level - 1)]
+            if node.module:
+                parts.append(node.module)
+            return '.'.join(parts)
+        return self._absolute_name(info, node.module)
+
+    def _absolute_name(self, info, name):
+        """Resolve implicit relative import of python 2"""
+        if not info.absolute_import and info.package:
+            relative = '%s.%s' % (info.package, name)
+            if self._is_project_module(relative):
+                return relative
+        return name
+
+    def _is_project_module(self, name):
+        if name in self.modules:
+            return True
+        prefix = name + '.'
+        return any(m.startswith(prefix) for m in self.modules)
+
+    def resolve(self, module, name, seen=None):
+        """Return (module, class name) which name in module refers to
+
+        :rtype: (str, str)|None
+        """
+        seen = seen or set()
+        if (module, name) in seen:
+            return None
+        seen.add((module, name))
+
+        info = self.modules.get(module)
+        if info is None:
+            if self._is_project_module('%s.%s' % (module, name)):
+                return None  # it is module, not class
+            return module, name  # external class
+
+        if name in info.classes:
+            return module, name
+        if name in info.names:
+            ref = info.names[name]
+            if ref[0] == 'attr':
+                return self.resolve(ref[1], ref[2], seen)
+            return None
+        for star_module in info.star_imports:
+            result = self.resolve(star_module, name, seen)
+            if result is not None:
+                return result
+        return None
+
+    def resolve_expr(self, info, node):
+        chain = _attribute_chain(node)
+        if not chain:
+            return None
+        if len(chain) == 1:
+            return self.resolve(info.name, chain[0])
+
+        ref = info.names.get(chain[0])
+        if ref is None:
+            return None
+        elif ref[0] == 'module':
+            module = ref[1]
+        else:
+            module = '%s.%s' % (ref[1], ref[2])
+        module = '.'.join([module] + chain[1:-1])
+        return self.resolve(module, chain[-1])
+
+    def kind(self, module, name):
+        """Return kind of class: FLOW, EMBEDDED_FLOW, JOB or None"""
+        key = (module, name)
+        if key not in self._kinds:
+            self._kinds[key] = None  # protect from cyclic inheritance
+            self._kinds[key] = self._get_kind(module, name)
+        return self._kinds[key]
+
+    def _get_kind(self, module, name):
+        info = self.modules.get(module)
+        if info is None:
+            return _external_kind(module, name)
+
+        kinds = set()
+        for base in info.classes[name]:
+            qualified = self.resolve_expr(info, base)
+            if qualified is not None:
+                kinds.add(self.kind(*qualified))
+        for kind in (EMBEDDED_FLOW, FLOW, JOB):
+            if kind in kinds:
+                return kind
+        return None
+
+    def find_flows(self):
+        """Return not embedded flows defined in project modules
+
+        :return: relative module path -> list of flow class names
+        :rtype: dict[str, list[str]]
+        """
+        flows = {}
+        for module, info in self.modules.iteritems():
+            for name in info.classes:
+                if self.kind(module, name) == FLOW:
+                    flows.setdefault(info.path, []).append(name)
+        return flows
+
+
+def _external_kind(module, name):
+    # Only nagini itself is inspected, other packages may be heavy to import
+    if module != 'nagini' and not module.startswith('nagini.'):
+        return None
+    try:
+        item = getattr(__import__(module, fromlist=[name]), name)
+    except (ImportError, AttributeError):
+        return None
+    if not isinstance(item, type):
+        return None
+    elif issubclass(item, EmbeddedFlow):
+        return EMBEDDED_FLOW
+    elif issubclass(item, BaseFlow):
+        return FLOW
+    elif issubclass(item, BaseJob):
+        return JOB
+    return None
+
+
+def find_flows(base_dir, path=''):
+    """Find flows of project without importing its modules
+
+    :param str base_dir: directory which contains project package
+    :param str path: directory of project relative to base_dir
+    :return: relative module path -> list of flow class names
+    :rtype: dict[str, list[str]]
+    """
+    return StaticFlowFinder(base_dir).scan(path).find_flows()
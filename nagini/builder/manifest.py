@@ -0,0 +1,56 @@
+# -*- coding: utf8 -*-
+from os.path import join, exists, dirname, expanduser
+from os import makedirs, rename
+import zipfile
+import hashlib
+import logging
+import json
+
+
+logger = logging.getLogger(__name__)
+
+
+def zip_digest(zip_path):
+    """Return digest of zip content. Timestamps and order of entries
+    are ignored, so equal projects built at different time are equal.
+
+    :param str zip_path: path to zip archive
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in sorted(archive.infolist(), key=lambda i: i.filename):
+            digest.update('%s\0%08x\0%d\n' % (info.filename.encode('utf8'),
+                                              info.CRC, info.file_size))
+    return digest.hexdigest()
+
+
+class UploadManifest(object):
+    """Digests of project zips last uploaded to each server"""
+
+    def __init__(self, cache_dir, host):
+        self.filename = join(expanduser(cache_dir), 'uploads.json')
+        self.host = host
+        self._data = {}
+        if exists(self.filename):
+            try:
+                with open(self.filename) as fd:
+                    self._data = json.load(fd)
+            except ValueError:
+                logger.warning('Upload manifest %s is corrupted, ignore it',
+                               self.filename)
+
+    def is_uploaded(self, project, digest):
+        return self._data.get(self.host, {}).get(project) == digest
+
+    def set_uploaded(self, project, digest):
+        self._data.setdefault(self.host, {})[project] = digest
+        self.save()
+
+    def save(self):
+        if not exists(dirname(self.filename)):
+            makedirs(dirname(self.filename))
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as fd:
+            json.dump(self._data, fd, indent=2, sort_keys=True)
+        rename(tmp_filename, self.filename)
@@ -1,49 +1,97 @@
 # -*- coding: utf8 -*-
-from os.path import join, basename, exists, abspath
-from nagini.loader import load_module, remove_ext, find_py
-from nagini.builder.wrappers import FlowWrapper
+from os.path import join, basename, exists, abspath, dirname
+from nagini.builder.archive import write_zip, project_entries
+from nagini.loader import load_module, find_py
+from nagini.builder.wrappers import (FlowWrapper, LAUNCHER_FILENAME,
+                                     REGISTRY_FILENAME, project_source)
+from nagini.builder.templates import render_template
+from nagini.builder.discovery import find_flows
+from nagini.builder.profiler import Profiler
 from nagini import BaseFlow, EmbeddedFlow
+from os import remove, close, rmdir, symlink
 from copy import deepcopy
-from os import remove
 import tempfile
 import inspect
-import shutil
 import yaml
+import ast
+import json
+import time
 import sys
 
 
+def _make_zip_path(name, zip_filename=None):
+    if zip_filename:
+        return zip_filename
+    fd, zip_path = tempfile.mkstemp('.zip', name + '-')
+    close(fd)
+    return zip_path
+
+
+def _imported_modules(module):
+    """Yield loaded modules which are imported by module. Imports are read
+    from source because imported names may refer to plain values.
+    """
+    source_file = inspect.getsourcefile(module)
+    with open(source_file) as fd:
+        tree = ast.parse(fd.read(), source_file)
+    package = module.__name__.rpartition('.')[0]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parts = package.split('.')
+                if node.level > 1:
+                    parts = parts[:-(node.level - 1)]
+                base = '.'.join(parts + filter(None, [node.module]))
+            names = [base] + ['%s.%s' % (base, alias.name)
+                              for alias in node.names]
+        else:
+            continue
+        for name in names:
+            # Implicit relative import of python 2
+            for candidate in (name, '%s.%s' % (package, name)):
+                imported = sys.modules.get(candidate)
+                if imported is not None and imported is not module:
+                    yield imported
+
+
 class PlainProjectPackage(object):
     base_dir = None
     _clean = False
     zip_path = None
+    progress_callback = None  # callable(name, progress) instead of drawing
+    profiler = Profiler(enabled=False)
 
-    def __init__(self, project_path):
+    def __init__(self, project_path, zip_workers=None, profiler=None):
+        """
+        :param str project_path: path to project directory
+        :param int zip_workers: number of threads compressing zip members
+        :param Profiler profiler: profiler of build phases
+        """
         self.project_path = project_path
         self.name = basename(abspath(project_path))
-        self.tmp_dir = tempfile.mkdtemp(prefix=self.name + '-')
+        self.zip_workers = zip_workers
+        if profiler is not None:
+            self.profiler = profiler
 
     def build(self, zip_filename=None, config=None):
-        self.base_dir = self.tmp_dir
-        shutil.copytree(self.project_path, join(self.tmp_dir, self.name))
+        self.base_dir = dirname(abspath(self.project_path))
+        self.zip_path = _make_zip_path(self.name, zip_filename)
+        with self.profiler.phase(self.name, 'zip'):
+            write_zip(self.zip_path,
+                      project_entries(self.project_path, self.name),
+                      workers=self.zip_workers)
 
-        if zip_filename:
-            self.zip_path = zip_filename
+        if self.progress_callback is not None:
+            self.progress_callback(self.name, 100)
         else:
-            _, self.zip_path = tempfile.mkstemp('.zip', self.name + '-')
-
-        shutil.make_archive(
-            remove_ext(self.zip_path),
-            'zip',
-            join(self.base_dir)
-        )
-
-        sys.stdout.write('{name:<30}{progress:>30}'.format(name=self.name, progress='OK'))
-        sys.stdout.flush()
+            sys.stdout.write('{name:<30}{progress:>30}'.format(name=self.name, progress='OK'))
+            sys.stdout.flush()
 
     def clear(self):
         if not self._clean:
-            if exists(self.tmp_dir):
-                shutil.rmtree(self.tmp_dir)
             if self.zip_path and exists(self.zip_path):
                 remove(self.zip_path)
             self._clean = True
@@ -53,58 +101,176 @@ class ProjectPackage(object):
     base_dir = None
     _clean = False
     zip_path = None
+    progress_callback = None  # callable(name, progress) instead of drawing
+    profiler = Profiler(enabled=False)
 
-    def __init__(self, project_path):
+    def __init__(self, project_path, cache=None, static=False,
+                 zip_workers=None, profiler=None):
+        """
+        :param str project_path: path to project directory
+        :param BuildCache cache: cache of generated files
+        :param bool static: find flows by parsing sources of modules and
+        import only modules which contain flows
+        :param int zip_workers: number of threads compressing zip members
+        :param Profiler profiler: profiler of build phases
+        """
         self.project_path = project_path
         self.name = basename(abspath(project_path))
-        self.tmp_dir = tempfile.mkdtemp(prefix=self.name + '-')
-        self.jobs = {}
+        self.jobs = {}  # job name -> "import.path:ClassName"
+        self.files = {}  # generated files, name -> content
+        self.cache = cache
+        self.static = static
+        self.zip_workers = zip_workers
+        if profiler is not None:
+            self.profiler = profiler
+        self._cache_entry = None
 
     def build(self, zip_filename=None, config=None):
-        sys.path.insert(0, self.tmp_dir)
-        self.base_dir = self.tmp_dir
-        shutil.copytree(self.project_path, join(self.tmp_dir, self.name))
-        for module_path, item in self._find_flows():
-            wrapper = FlowWrapper(item, self)
-            wrapper.build()
+        # Modules are imported right from the project directory, bytecode
+        # isn't written to keep sources clean. Project is imported through
+        # directory which contains only link to it, so other directories
+        # and modules placed near the project can't shadow any module.
+        self.base_dir = tempfile.mkdtemp(prefix='nagini-import-')
+        link = join(self.base_dir, self.name)
+        symlink(abspath(self.project_path), link)
+        dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = True
+        sys.path.insert(0, self.base_dir)
+        try:
+            for module_path, item in self._find_flows():
+                wrapper = FlowWrapper(item, self)
+                wrapper.build()
+        finally:
+            sys.path.remove(self.base_dir)
+            sys.dont_write_bytecode = dont_write_bytecode
+            remove(link)
+            rmdir(self.base_dir)
+        if self.cache is not None:
+            with self.profiler.phase(self.name, 'cache'):
+                self.cache.save()
 
-        if exists(join(self.project_path, 'system.properties')):
-            shutil.copy(join(self.project_path, 'system.properties'),
-                        self.base_dir)
+        if self.jobs:
+            self.files[REGISTRY_FILENAME] = json.dumps(self.jobs,
+                                                       sort_keys=True)
+            self.files[LAUNCHER_FILENAME] = render_template(
+                'launcher.py.j2', registry=REGISTRY_FILENAME
+            )
 
-        if zip_filename:
-            self.zip_path = zip_filename
-        else:
-            _, self.zip_path = tempfile.mkstemp('.zip', self.name + '-')
+        entries = list(project_entries(self.project_path, self.name))
+        if exists(join(self.project_path, 'system.properties')):
+            entries.append(('system.properties',
+                            join(self.project_path, 'system.properties')))
 
         if config:
             config = deepcopy(config)
             config['project'] = self.name
-            with open(join(self.base_dir, 'config.yml'), 'w') as fd:
-                yaml.dump(config, fd)
+            self.files['config.yml'] = yaml.dump(config)
 
-        shutil.make_archive(
-            remove_ext(self.zip_path),
-            'zip',
-            join(self.base_dir)
-        )
+        self.zip_path = _make_zip_path(self.name, zip_filename)
+        with self.profiler.phase(self.name, 'zip'):
+            write_zip(self.zip_path, entries, self.files,
+                      workers=self.zip_workers)
+
+    def write_file(self, filename, content, source_files=()):
+        """Add generated file to the root of project package
+
+        :param str filename: name of file
+        :param str content: content of file
+        :param list[str] source_files: modules which classes the file is
+        made of
+        """
+        self.files[filename] = content
+        if self._cache_entry is not None:
+            self._cache_entry.add_file(filename, content, source_files)
+
+    def register_job(self, name, import_path, class_name, source_files=()):
+        """Add job to the registry of generic launcher
+
+        :param str name: name of job
+        :param str import_path: path to import module of job
+        :param str class_name: name of job class in module
+        :param list[str] source_files: modules which class of the job is
+        made of
+        """
+        target = '%s:%s' % (import_path, class_name)
+        self.jobs[name] = target
+        if self._cache_entry is not None:
+            self._cache_entry.add_job(name, target, source_files)
+
+    def _load_module(self, module_path):
+        start = time.time()
+        try:
+            return load_module(module_path)
+        finally:
+            seconds = time.time() - start
+            self.profiler.add(self.name, 'import', seconds)
+            self.profiler.add_import(self.name, module_path, seconds)
+
+    def _add_import_dependencies(self, module):
+        """Flows of module depend on project modules it imports"""
+        for imported in _imported_modules(module):
+            source_file = project_source(imported, self)
+            if source_file:
+                self._cache_entry.add_dependencies([source_file])
 
     def _find_flows(self):
-        modules = list(find_py(self.tmp_dir))
+        with self.profiler.phase(self.name, 'discover'):
+            modules = []
+            for module_path in find_py(join(self.base_dir, self.name)):
+                if module_path.startswith(self.base_dir):
+                    module_path = module_path.replace(self.base_dir, '', 1)
+                    module_path = module_path.strip('/')
+                modules.append(module_path)
+
+            if self.cache is not None:
+                self.cache.scan(self.base_dir, modules)
+            if self.static:
+                static_flows = find_flows(self.base_dir, self.name)
+
         for n, module_path in enumerate(modules):
             self.draw_progress(int(100.0 / len(modules) * (n + 1)))
-            if module_path.startswith(self.tmp_dir):
-                module_path = module_path.replace(self.tmp_dir, '', 1)
-                module_path = module_path.strip('/')
+            if self.cache is not None:
+                entry = self.cache.get(module_path)
+                if entry is not None:
+                    for filename, content in entry['files'].iteritems():
+                        self.write_file(filename, content)
+                    self.jobs.update(entry['jobs'])
+                    continue
+                self._cache_entry = self.cache.new_entry(module_path)
 
-            for name, item in inspect.getmembers(load_module(module_path)):
+            module = None
+            if self.static:
+                if module_path in static_flows:
+                    module = self._load_module(module_path)
+                    members = [(name, getattr(module, name))
+                               for name in static_flows[module_path]]
+                else:
+                    members = []
+            else:
+                module = self._load_module(module_path)
+                members = inspect.getmembers(module)
+            if self._cache_entry is not None and module is not None:
+                self._add_import_dependencies(module)
+
+            for name, item in members:
                 if inspect.isclass(item) and issubclass(item, BaseFlow):
                     if not issubclass(item, EmbeddedFlow):
+                        if self._cache_entry is not None:
+                            self._cache_entry.flows.append(name)
                         yield module_path, item
-        print
+
+            if self._cache_entry is not None:
+                self.cache.commit(self._cache_entry)
+                self._cache_entry = None
+        if self.progress_callback is None:
+            print
 
     def draw_progress(self, progress):
         """Width: 60"""
+        if self.progress_callback is not None:
+            self.progress_callback(self.name, progress)
+            return
+
         if progress == 100:
             bar = ''
             progress = 'OK'
@@ -121,8 +287,6 @@ class ProjectPackage(object):
 
     def clear(self):
         if not self._clean:
-            if exists(self.tmp_dir):
-                shutil.rmtree(self.tmp_dir)
             if self.zip_path and exists(self.zip_path):
                 remove(self.zip_path)
             self._clean = True
@@ -0,0 +1,110 @@
+# -*- coding: utf8 -*-
+from nagini.builder.package import PlainProjectPackage, ProjectPackage
+from nagini.builder.templates import enable_bytecode_cache
+from nagini.builder.profiler import Profiler
+from nagini.builder.cache import BuildCache
+from os.path import join, expanduser
+from multiprocessing import Pool, Manager
+from Queue import Empty
+import sys
+
+
+_progress_queue = None
+_last_progress = {}
+
+
+def make_package(root_path, plain=False, cache_dir=None, static=False,
+                 profiler=None):
+    """Return package of project placed in root_path
+
+    :param str root_path: path to project directory
+    :param bool plain: don't build nagini project files
+    :param str cache_dir: directory of build cache, None to disable cache
+    :param bool static: find flows without importing all modules
+    :param Profiler profiler: profiler of build phases
+    :rtype: ProjectPackage|PlainProjectPackage
+    """
+    if plain:
+        return PlainProjectPackage(root_path, profiler=profiler)
+    elif cache_dir:
+        enable_bytecode_cache(join(expanduser(cache_dir), 'templates'))
+        return ProjectPackage(root_path,
+                              cache=BuildCache(cache_dir, root_path),
+                              static=static, profiler=profiler)
+    else:
+        return ProjectPackage(root_path, static=static, profiler=profiler)
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _report_progress(name, progress):
+    # Report only every 10% to keep output of many workers readable
+    step = progress // 10
+    if _last_progress.get(name) != step:
+        _last_progress[name] = step
+        _progress_queue.put((name, progress))
+
+
+def _build_project(root_path, plain, cache_dir, static, profile, config):
+    profiler = Profiler() if profile else None
+    project = make_package(root_path, plain, cache_dir, static, profiler)
+    project.progress_callback = _report_progress
+    project.build(config=config)
+    project.progress_callback = None
+    if hasattr(project, 'cache'):
+        project.cache = None
+    return project
+
+
+def _print_progress(name, progress):
+    progress = 'OK' if progress == 100 else '%d%%' % progress
+    sys.stdout.write('{name:<30}{progress:>30}\n'.format(name=name,
+                                                         progress=progress))
+    sys.stdout.flush()
+
+
+def build_projects(paths, config=None, plain=False, cache_dir=None,
+                   static=False, profiler=None, jobs=1):
+    """Build every project in its own worker process
+
+    Progress of workers is printed line by line while projects are built.
+
+    :param list[str] paths: paths to project directories
+    :param dict config: config to put into projects
+    :param bool plain: don't build nagini project files
+    :param str cache_dir: directory of build cache, None to disable cache
+    :param bool static: find flows without importing all modules
+    :param Profiler profiler: profiler which gets results of workers
+    :param int jobs: number of worker processes
+    :return: built packages in order of paths
+    :rtype: list[ProjectPackage|PlainProjectPackage]
+    """
+    manager = Manager()
+    queue = manager.Queue()
+    # One project per process: sys.path and sys.modules of projects
+    # never mix up
+    pool = Pool(processes=jobs, initializer=_init_worker, initargs=(queue,),
+                maxtasksperchild=1)
+    try:
+        results = [pool.apply_async(_build_project,
+                                    (path, plain, cache_dir, static,
+                                     profiler is not None, config))
+                   for path in paths]
+        pool.close()
+        while not all(r.ready() for r in results) or not queue.empty():
+            try:
+                _print_progress(*queue.get(timeout=0.1))
+            except Empty:
+                pass
+        projects = [r.get() for r in results]
+        if profiler is not None:
+            for project in projects:
+                profiler.merge(project.profiler)
+        return projects
+    finally:
+        pool.terminate()
+        pool.join()
+        manager.shutdown()
@@ -0,0 +1,98 @@
+# -*- coding: utf8 -*-
+from contextlib import contextmanager
+from threading import Lock
+import json
+import time
+
+
+class Profiler(object):
+    """Collects durations of build phases and module imports per project"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = {}  # project -> phase -> seconds
+        self.imports = {}  # project -> module -> seconds
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, project, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(project, name, time.time() - start)
+
+    def add(self, project, name, seconds):
+        if self.enabled:
+            with self._lock:
+                phases = self.phases.setdefault(project, {})
+                phases[name] = phases.get(name, 0.0) + seconds
+
+    def add_import(self, project, module, seconds):
+        if self.enabled:
+            with self._lock:
+                self.imports.setdefault(project, {})[module] = seconds
+
+    def merge(self, other):
+        """Add results of profiler of another process
+
+        :param Profiler other:
+        """
+        for project, phases in other.phases.iteritems():
+            for name, seconds in phases.iteritems():
+                self.add(project, name, seconds)
+        for project, imports in other.imports.iteritems():
+            for module, seconds in imports.iteritems():
+                self.add_import(project, module, seconds)
+
+    def slowest_imports(self, limit=10):
+        """Return list of (seconds, project, module) of slowest imports"""
+        imports = [(seconds, project, module)
+                   for project, modules in self.imports.iteritems()
+                   for module, seconds in modules.iteritems()]
+        return sorted(imports, reverse=True)[:limit]
+
+    def to_dict(self):
+        return {
+            'projects': dict(
+                (project, {'phases': self.phases.get(project, {}),
+                           'imports': self.imports.get(project, {})})
+                for project in set(self.phases) | set(self.imports)
+            ),
+            'slowest_imports': [
+                {'project': project, 'module': module, 'seconds': seconds}
+                for seconds, project, module in self.slowest_imports()
+            ]
+        }
+
+    def save(self, filename):
+        with open(filename, 'w') as fd:
+            json.dump(self.to_dict(), fd, indent=4, sort_keys=True)
+
+    def report(self):
+        """Return human readable report"""
+        names = sorted(set(n for p in self.phases.itervalues() for n in p))
+        lines = ['{0:<30}'.format('Project') +
+                 ''.join('{0:>10}'.format(n) for n in names)]
+        for project in sorted(self.phases):
+            phases = self.phases[project]
+            lines.append('{0:<30}'.format(project) + ''.join(
+                '{0:>10.3f}'.format(phases.get(n, 0.0)) for n in names
+            ))
+        lines.append('')
+        lines.append('Slowest imports:')
+        for seconds, project, module in self.slowest_imports():
+            lines.append('{0:<50}{1:>10.3f}'.format(module, seconds))
+        return '\n'.join(lines)
@@ -1,14 +1,53 @@
 # -*- coding: utf8 -*-
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from os.path import dirname, abspath, join, exists
-from jinja2 import Template
+from os import listdir, makedirs
+import hashlib
 
 if exists(abspath(join(dirname(__file__), "../../data"))):
     _templates_dir = abspath(join(dirname(__file__), "../../data"))
 else:
     _templates_dir = "/usr/share/nagini"
 
+# Templates are compiled once per process, they aren't changed while building
+_environment = Environment(loader=FileSystemLoader(_templates_dir),
+                           auto_reload=False)
+
+
+def enable_bytecode_cache(directory):
+    """Store compiled templates on disk to share them between processes
+
+    :param str directory: directory for compiled templates
+    """
+    if not exists(directory):
+        makedirs(directory)
+    _environment.bytecode_cache = FileSystemBytecodeCache(directory)
+
 
 def render_template(filename, **kwargs):
-    with open(join(_templates_dir, filename)) as fd:
-        template = Template(fd.read())
-    return template.render(**kwargs)
+    return _environment.get_template(filename).render(**kwargs)
+
+
+def render_templates(filename, contexts):
+    """Render template for each context
+
+    :param str filename: name of template
+    :param list[dict] contexts: variables of each rendering
+    :rtype: list[unicode]
+    """
+    template = _environment.get_template(filename)
+    return [template.render(**context) for context in contexts]
+
+
+def templates_hash():
+    """Return digest of all templates used for building
+
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for filename in sorted(listdir(_templates_dir)):
+        if filename.endswith(".j2"):
+            digest.update(filename)
+            with open(join(_templates_dir, filename), "rb") as fd:
+                digest.update(fd.read())
+    return digest.hexdigest()
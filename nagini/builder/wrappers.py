@@ -1,13 +1,38 @@
 # -*- coding: utf8 -*-
 from nagini.loader import load_module, path_to_import
 from nagini.flow import BaseFlow, EmbeddedFlow
-from templates import render_template
+from templates import render_templates
 from nagini.utility import flatten
+from os.path import abspath, join
 from nagini.job import BaseJob
-from os.path import join
 import inspect
 
 
+# Generic launcher of all jobs and registry it finds jobs in
+LAUNCHER_FILENAME = "NaginiLauncher.py"
+REGISTRY_FILENAME = "nagini_jobs.json"
+
+
+def project_source(obj, project):
+    """Return path of source file of object relative to base dir of
+    project or None if object is not defined in project
+
+    :param obj: module, class or function
+    :param project: project package
+    :rtype: str|None
+    """
+    try:
+        source_file = inspect.getsourcefile(obj)
+    except TypeError:
+        return None
+    if not source_file:
+        return None
+    source_file = abspath(source_file)
+    if not source_file.startswith(join(project.base_dir, project.name, "")):
+        return None
+    return source_file[len(project.base_dir):].strip("/")
+
+
 class JobWrapper(object):
     source_file = None  # full path to source file
     root_path = None  # project root path
@@ -26,8 +51,15 @@ class JobWrapper(object):
             self.source_file = self.source_file.replace(project.base_dir, "")
             self.source_file = self.source_file.strip("/")
         self.import_path = path_to_import(self.source_file)
+        # Modules of project classes which attributes are inherited by job
+        self.source_files = [self.source_file]
+        for cls in inspect.getmro(class_obj)[1:]:
+            source_file = project_source(cls, project)
+            if source_file and source_file not in self.source_files:
+                self.source_files.append(source_file)
         self.dependencies = []
         self.flow = self
+        self._wrappers = {}  # job class -> wrapper, built within this flow
         # print "Init job wrapper for", self.class_obj
 
     def build_dependencies(self):
@@ -37,23 +69,28 @@ class JobWrapper(object):
             # print "Error in class", self.class_obj
             return
         for require in flatten(job.requires()):
-            if isinstance(require, EmbeddedFlow):
-                wrapper = EmbeddedFlowWrapper(require.__class__, self.project)
-            elif isinstance(require, BaseFlow):
-                wrapper = EmbeddedFlowWrapper(require.__class__, self.project)
-                wrapper._build_deps = False
-            elif isinstance(require, BaseJob):
-                wrapper = JobWrapper(require.__class__, self.project)
-            else:
-                continue
-            wrapper.flow = self.flow
-            wrapper.build()
-            self.dependencies.append(wrapper)
+            # Every job of flow is built once however many jobs require it
+            wrapper = self.flow._wrappers.get(require.__class__)
+            if wrapper is None:
+                if isinstance(require, EmbeddedFlow):
+                    wrapper = EmbeddedFlowWrapper(require.__class__,
+                                                  self.project)
+                elif isinstance(require, BaseFlow):
+                    wrapper = EmbeddedFlowWrapper(require.__class__,
+                                                  self.project)
+                    wrapper._build_deps = False
+                elif isinstance(require, BaseJob):
+                    wrapper = JobWrapper(require.__class__, self.project)
+                else:
+                    continue
+                wrapper.flow = self.flow
+                self.flow._wrappers[require.__class__] = wrapper
+                wrapper.build()
+            if wrapper not in self.dependencies:
+                self.dependencies.append(wrapper)
 
     def build(self):
         self.build_dependencies()
-        self._make_launcher_file()
-        self._make_job_file()
 
     def _job_filename(self):
         return self.name + ".job"
@@ -61,36 +98,38 @@ class JobWrapper(object):
     def _job_name(self):
         return self.name
 
-    def _make_job_file(self):
-        content = render_template(
-            filename="job-template.job.j2",
+    def _job_context(self):
+        return dict(
             type=self._job_type,
             dependencies=[d._job_name() for d in self.dependencies],
             name=self.name,
             retries=getattr(self.class_obj, "retries", 0),
-            retry_backoff=getattr(self.class_obj, "retry_backoff", 0)
+            retry_backoff=getattr(self.class_obj, "retry_backoff", 0),
+            launcher=LAUNCHER_FILENAME
         )
-        filename = join(self.project.base_dir, self._job_filename())
-        with open(filename, "w") as fd:
-            fd.write(content)
-
-    def _make_launcher_file(self):
-        content = render_template(
-            filename="launcher.py.j2",
-            import_path=self.import_path,
-            name=self.name
-        )
-        filename = join(self.project.base_dir, self.name + "Launcher.py")
-        with open(filename, "w") as fd:
-            fd.write(content)
 
 
 class FlowWrapper(JobWrapper):
     def build(self):
-        self.build_dependencies()
+        profiler = self.project.profiler
+        with profiler.phase(self.project.name, "dag"):
+            self.build_dependencies()
         if self.dependencies:
-            self._make_launcher_file()
-            self._make_job_file()
+            with profiler.phase(self.project.name, "render"):
+                self._make_files([self] + self._wrappers.values())
+
+    def _make_files(self, wrappers):
+        """Render files of all jobs of the flow in one pass"""
+        job_files = render_templates(
+            "job-template.job.j2", [w._job_context() for w in wrappers]
+        )
+        for wrapper, job_file in zip(wrappers, job_files):
+            if wrapper._job_type == "command":
+                self.project.register_job(wrapper.name, wrapper.import_path,
+                                          wrapper.class_obj.__name__,
+                                          wrapper.source_files)
+            self.project.write_file(wrapper._job_filename(), job_file,
+                                    wrapper.source_files)
 
 
 class EmbeddedFlowWrapper(JobWrapper):
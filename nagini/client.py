@@ -1,26 +1,167 @@
 # -*- coding: utf8 -*-
+from multiprocessing.pool import ThreadPool
+from requests.packages.urllib3.exceptions import ConnectTimeoutError
+from requests.adapters import HTTPAdapter
+from nagini.multipart import MultipartEncoder
 import requests
 
 from os.path import join, basename
+from threading import Lock
 import logging
+import socket
+import errno
+import time
 
 
 logger = logging.getLogger(__name__)
 
+# Responses of proxy when Azkaban is restarting or overloaded
+RETRY_STATUS_CODES = frozenset([502, 503, 504])
+# Ajax actions which are safe to repeat after server got the request
+IDEMPOTENT_ACTIONS = frozenset(['fetchexecflow', 'getRunning',
+                                'fetchExecJobLogs'])
+# Statuses of flows and jobs which will not change anymore
+FINAL_STATUSES = frozenset(['SUCCEEDED', 'FAILED', 'KILLED', 'CANCELLED',
+                            'SKIPPED', 'DISABLED', 'FAILED_SUCCEEDED'])
+LOG_PAGE_SIZE = 1 << 20
+# Errors of socket which mean that connection isn't established
+CONNECT_ERRNOS = frozenset([errno.ECONNREFUSED, errno.EHOSTUNREACH,
+                            errno.ENETUNREACH])
+# Status of execution which info can't be fetched, it isn't Azkaban status
+FETCH_ERROR = 'FETCH_ERROR'
+
 
 class AzkabanClientError(Exception):
     pass
 
 
+def _find_node(execution_info, job_name):
+    """Return node of job in execution info including embedded flows"""
+    nodes = list(execution_info.get("nodes", []))
+    while nodes:
+        node = nodes.pop()
+        if job_name in (node.get("id"), node.get("nestedId")):
+            return node
+        nodes.extend(node.get("nodes", []))
+    return {}
+
+
+def _is_connect_error(error):
+    """Return True if request failed before it was sent to server
+
+    :param requests.ConnectionError error:
+    """
+    # ConnectTimeout appeared in requests 2.4
+    if isinstance(error, getattr(requests.exceptions, 'ConnectTimeout', ())):
+        return True
+    # Connection is refused or can't be established in time, NewConnectionError
+    # is subclass of ConnectTimeoutError. Old urllib3 passes error of socket.
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    if isinstance(reason, socket.error):
+        return reason.errno in CONNECT_ERRNOS
+    return isinstance(reason, ConnectTimeoutError)
+
+
+class RateLimiter(object):
+    """Thread safe limiter which spreads calls evenly in time"""
+
+    def __init__(self, rate=None):
+        """
+        :param float rate: max number of calls per second, None is unlimited
+        """
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0
+        self._lock = Lock()
+
+    def wait(self):
+        """Block until next call is allowed"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        time.sleep(max(0, at - now))
+
+
 class AzkabanClient(object):
     session_id = None
+    _credentials = None
+    _session_cache = None
 
-    def __init__(self, host):
+    def __init__(self, host, pool_size=10, retries=3, retry_backoff=0.5):
+        """
+        :param str host: url of Azkaban web server
+        :param int pool_size: max number of kept alive connections
+        :param int retries: number of retries of failed requests
+        :param float retry_backoff: delay before first retry in seconds,
+        delay is doubled for each next retry
+        """
         self.host = host
+        self.pool_size = pool_size
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
-    def login(self, username, password):
-        r = requests.post(
+    def _request(self, method, url, idempotent=False, **kwargs):
+        """Make request over shared session. Request is retried with
+        exponential backoff when connection can't be established. Idempotent
+        request is also retried when proxy returns error or connection is
+        broken after request is sent.
+
+        :param bool idempotent: request may be repeated safely
+        """
+        attempt = 0
+        while True:
+            try:
+                r = self.session.request(method, url, **kwargs)
+                if not idempotent or r.status_code not in RETRY_STATUS_CODES \
+                        or attempt >= self.retries:
+                    return r
+                logger.warning('Server return error code %d on "%s" %s, '
+                               'retry...', r.status_code, method, url)
+            except requests.ConnectionError as e:
+                if attempt >= self.retries or \
+                        not (idempotent or _is_connect_error(e)):
+                    raise
+                logger.warning('Connection error on "%s" %s, retry...',
+                               method, url, exc_info=True)
+
+            time.sleep(self.retry_backoff * 2 ** attempt)
+            attempt += 1
+            for item in kwargs.get('files', {}).itervalues():
+                if hasattr(item[1], 'seek'):
+                    item[1].seek(0)
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+
+    def login(self, username, password, session_cache=None):
+        """Authenticate on server
+
+        :param str username:
+        :param str password:
+        :param SessionCache session_cache: cache to reuse session id of
+        previous login instead of logging in again
+        """
+        self._credentials = (username, password)
+        self._session_cache = session_cache
+        if session_cache is not None:
+            session_id = session_cache.get(self.host, username)
+            if session_id is not None:
+                self.session_id = session_id
+                return
+        self._login()
+
+    def _login(self):
+        username, password = self._credentials
+        r = self._request(
+            'post',
             url=self.host,
+            idempotent=True,
             data={
                 "action": "login",
                 "username": username,
@@ -42,10 +183,30 @@ class AzkabanClient(object):
             raise Exception("Authentication fails. Server return: %s" % json_data)
         else:
             self.session_id = json_data["session.id"]
+            if self._session_cache is not None:
+                self._session_cache.set(self.host, username, self.session_id)
 
     def _call_api(self, method, suffix, params, **kwargs):
+        result = self._call_api_once(method, suffix, params, **kwargs)
+        if isinstance(result, dict) and result.get('error') == 'session' \
+                and self._credentials is not None:
+            # Session is expired or rejected, login again and retry once
+            logger.info('Session is rejected by server, login again')
+            if self._session_cache is not None:
+                self._session_cache.invalidate(self.host,
+                                               self._credentials[0],
+                                               self.session_id)
+            self._login()
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+            result = self._call_api_once(method, suffix, params, **kwargs)
+        return result
+
+    def _call_api_once(self, method, suffix, params, **kwargs):
         params.update({'session.id': self.session_id})
-        r = requests.request(method, join(self.host, suffix), params=params, **kwargs)
+        r = self._request(method, join(self.host, suffix), params=params,
+                          idempotent=params.get('ajax') in IDEMPOTENT_ACTIONS,
+                          **kwargs)
 
         try:
             return r.json()
@@ -68,15 +229,24 @@ class AzkabanClient(object):
                                       "description": description})
 
     def upload_project_zip(self, project, filename):
-        r = self._call_api(
-            method="post", suffix="manager", params={},
-            data={"ajax": "upload", "project": project},
-            files={
-                "file": (basename(filename),
-                         open(filename, "rb"),
-                         "application/zip")
-            }
-        )
+        """Upload project zip. Body is read by HTTP client through read() of
+        MultipartEncoder by small blocks, zip is never read into memory at
+        whole.
+        """
+        with open(filename, "rb") as fd:
+            body = MultipartEncoder(
+                fields={"ajax": "upload", "project": project},
+                files={"file": (basename(filename), fd, "application/zip")}
+            )
+            start = time.time()
+            r = self._call_api(method="post", suffix="manager", params={},
+                               data=body,
+                               headers={"Content-Type": body.content_type})
+            elapsed = max(time.time() - start, 1e-6)
+        logger.info('Project "%s" uploaded: %.1f MB in %.1f s (%.1f MB/s)',
+                    project, body.len / 1048576.0, elapsed,
+                    body.len / 1048576.0 / elapsed)
+
         err = 'None' if r is None else r.get('error', 'empty')
         if not r or r.get('error'):
             raise AzkabanClientError('Fail to upload project zip: %s' % err)
@@ -93,6 +263,49 @@ class AzkabanClient(object):
         })
         return self._call_api(method="get", suffix="executor", params=kwargs)
 
+    def execute_flows(self, project, submissions, max_in_flight=None,
+                      rate=None, **kwargs):
+        """Start many flows concurrently
+
+        Failed submission doesn't stop others, its result is
+        {"error": message, "exception": name of exception class}, so it
+        differs from error response of server by "exception" key.
+
+        :param str project: name of project
+        :param list[(str,dict)] submissions: pairs of name of flow and its
+        properties
+        :param int max_in_flight: max number of concurrent requests, size of
+        connection pool by default
+        :param float rate: max number of requests per second, unlimited by
+        default
+        :param kwargs: other parameters of executeFlow, e.g.
+        concurrentOption
+        :return: responses of server in order of submissions
+        :rtype: list[dict]
+        """
+        submissions = list(submissions)
+        if not submissions:
+            return []
+        limiter = RateLimiter(rate)
+
+        def submit(submission):
+            flow, properties = submission
+            limiter.wait()
+            try:
+                return self.execute_flow(project, flow, properties,
+                                         **dict(kwargs))
+            except Exception as e:
+                logger.exception('Fail to start flow "%s"', flow)
+                return {"error": str(e), "exception": e.__class__.__name__}
+
+        pool = ThreadPool(min(len(submissions),
+                              max_in_flight or self.pool_size))
+        try:
+            return pool.map(submit, submissions)
+        finally:
+            pool.close()
+            pool.join()
+
     def get_running_executions(self, project, flow):
         """Return list of ids of current running executions
 
@@ -112,7 +325,117 @@ class AzkabanClient(object):
         return self._call_api("get", "executor",
                               {"ajax": "fetchexecflow", "execid": exec_id})
 
-    def get_job_logs(self, exec_id, job_name, offset=0, length=None):
+    def iter_finished_executions(self, exec_ids, timeout=None,
+                                 poll_interval=1.0, max_poll_interval=30.0,
+                                 max_errors=3):
+        """Poll executions concurrently and yield (exec_id, execution info)
+        as soon as each execution is finished. Every execution is polled
+        with its own interval which is doubled while its status doesn't
+        change and reset when it changes. Duplicated ids are polled once.
+
+        Failed poll is retried with the same backoff. Execution which fails
+        more than max_errors polls in a row is yielded with FETCH_ERROR
+        status and "error" message, other executions are polled further.
+
+        :param list[int] exec_ids: ids of executions
+        :param float timeout: stop polling after timeout seconds, executions
+        which are not finished by then are not yielded
+        :param float poll_interval: min delay between polls of execution
+        :param float max_poll_interval: max delay between polls of execution
+        :param int max_errors: max number of failed polls in a row
+        :rtype: collections.Iterable[(int, dict)]
+        """
+        now = time.time()
+        deadline = None if timeout is None else now + timeout
+        # exec_id -> [last status, poll interval, time of next poll,
+        # failed polls in a row]
+        pending = dict((int(exec_id), [None, poll_interval, now, 0])
+                       for exec_id in exec_ids)
+        if not pending:
+            return
+
+        pool = ThreadPool(min(len(pending), self.pool_size))
+        try:
+            while pending:
+                now = time.time()
+                last = deadline is not None and now >= deadline
+                due = [exec_id for exec_id, state in pending.iteritems()
+                       if last or state[2] <= now]
+                for exec_id, info, error in pool.imap_unordered(
+                        self._fetch_execution, due):
+                    state = pending[exec_id]
+                    if error is not None:
+                        state[3] += 1
+                        if state[3] > max_errors:
+                            del pending[exec_id]
+                            yield exec_id, {"execid": exec_id,
+                                            "status": FETCH_ERROR,
+                                            "error": error}
+                            continue
+                        state[1] = min(state[1] * 2, max_poll_interval)
+                        state[2] = time.time() + state[1]
+                        continue
+                    state[3] = 0
+                    status = info.get("status")
+                    if status in FINAL_STATUSES:
+                        del pending[exec_id]
+                        yield exec_id, info
+                        continue
+                    if status == state[0]:
+                        state[1] = min(state[1] * 2, max_poll_interval)
+                    else:
+                        state[0], state[1] = status, poll_interval
+                    state[2] = time.time() + state[1]
+
+                if last or not pending:
+                    return
+                wake = min(state[2] for state in pending.itervalues())
+                if deadline is not None:
+                    wake = min(wake, deadline)
+                time.sleep(max(0, wake - time.time()))
+        finally:
+            pool.terminate()
+
+    def wait_for_executions(self, exec_ids, timeout=None, poll_interval=1.0,
+                            max_poll_interval=30.0, max_errors=3):
+        """Wait until executions are finished
+
+        :param list[int] exec_ids: ids of executions
+        :param float timeout: max time of waiting in seconds
+        :param float poll_interval: min delay between polls of execution
+        :param float max_poll_interval: max delay between polls of execution
+        :param int max_errors: max number of failed polls of execution in
+        a row
+        :return: exec_id -> final status of execution, status is None if
+        execution is not finished before timeout and FETCH_ERROR if it
+        can't be fetched
+        :rtype: dict[int,str|None]
+        """
+        statuses = dict((int(exec_id), None) for exec_id in exec_ids)
+        for exec_id, info in self.iter_finished_executions(
+                statuses.keys(), timeout, poll_interval, max_poll_interval,
+                max_errors):
+            statuses[exec_id] = info["status"]
+        return statuses
+
+    def _fetch_execution(self, exec_id):
+        """Return (exec_id, execution info, None) or (exec_id, None, error
+        message), so failure of one execution doesn't stop polling others
+        """
+        try:
+            info = self.get_execution_info(exec_id)
+        except Exception as e:
+            logger.warning('Fail to fetch execution %s', exec_id,
+                           exc_info=True)
+            return exec_id, None, str(e)
+        if info.get("error"):
+            logger.warning('Fail to fetch execution %s: %s', exec_id,
+                           info["error"])
+            return exec_id, None, info["error"]
+        return exec_id, info, None
+
+    def get_job_logs(self, exec_id, job_name, offset=0, length=None,
+                     page_size=LOG_PAGE_SIZE):
         if length:
             return self._call_api("get", "executor", {
                 "ajax": "fetchExecJobLogs",
@@ -122,21 +445,69 @@ class AzkabanClient(object):
                 "length": length
             })
         else:
-            result = {"data": "", "length": None, "offset": offset}
+            data = "".join(self.iter_job_logs(exec_id, job_name, offset,
+                                              page_size))
+            return {"data": data, "length": len(data), "offset": offset}
+
+    def iter_job_logs(self, exec_id, job_name, offset=0,
+                      page_size=LOG_PAGE_SIZE, follow=False,
+                      poll_interval=1.0, max_poll_interval=30.0):
+        """Yield chunks of job log starting from offset
+
+        :param int exec_id: id of execution
+        :param str job_name: id of job in execution
+        :param int offset: offset in log to start from
+        :param int page_size: max size of chunk requested at once
+        :param bool follow: tail log of running job until it is finished
+        :param float poll_interval: min delay between polls in follow mode
+        :param float max_poll_interval: max delay between polls, delay is
+        doubled while log doesn't grow
+        :rtype: collections.Iterable[unicode]
+        """
+        interval = poll_interval
+        while True:
+            # Status is checked before reading, so nothing written before
+            # job is finished is lost
+            finished = not follow or self._is_job_finished(exec_id, job_name)
+            grown = False
             while True:
                 ret = self._call_api("get", "executor", {
                     "ajax": "fetchExecJobLogs",
                     "execid": exec_id,
                     "jobId": job_name,
                     "offset": offset,
-                    "length": 10000
+                    "length": page_size
                 })
-                result["data"] += ret["data"]
-                if ret["length"] < 10000:
+                if ret.get("error"):
+                    raise AzkabanClientError("Fail to fetch log of job %s: %s"
+                                             % (job_name, ret["error"]))
+                if ret.get("data"):
+                    grown = True
+                    yield ret["data"]
+                offset += ret.get("length", 0)
+                if ret.get("length", 0) < page_size:
                     break
-                offset += 10000
-            result["length"] = len(result["data"])
-            return result
+
+            if finished:
+                return
+            if grown:
+                interval = poll_interval
+            else:
+                interval = min(interval * 2, max_poll_interval)
+            time.sleep(interval)
+
+    def get_job_status(self, exec_id, job_name):
+        """Return status of job in execution or None if job is not found
+
+        :rtype: str|None
+        """
+        return _find_node(self.get_execution_info(exec_id),
+                          job_name).get("status")
+
+    def _is_job_finished(self, exec_id, job_name):
+        info = self.get_execution_info(exec_id)
+        return info.get("status") in FINAL_STATUSES or \
+            _find_node(info, job_name).get("status") in FINAL_STATUSES
 
     def reload_executors(self):
         return self._call_api('post', 'executor', {'ajax': 'reloadExecutors'})
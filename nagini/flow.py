@@ -1,12 +1,37 @@
 # -*- coding: utf8 -*-
 from nagini.client import AzkabanClient
+from nagini.session import SessionCache
+from nagini.yaml_cache import load_yaml
 from nagini.properties import props
 from nagini.utility import flatten
 from os.path import join
-import yaml
 import abc
 
 
+SESSION_FILENAME = ".nagini-session.json"
+_clients = {}  # (host, username) -> logged in AzkabanClient
+
+
+def get_client(server):
+    """Return logged in client shared by flows of the process. Session id
+    is also shared by jobs of execution through file in working dir.
+
+    :param dict server: server section of config: host, username, password
+    :rtype: AzkabanClient
+    """
+    key = (server["host"], server["username"])
+    if key not in _clients:
+        if "working.dir" in props:
+            cache = SessionCache(join(props["working.dir"], SESSION_FILENAME))
+        else:
+            cache = SessionCache()
+        client = AzkabanClient(server["host"])
+        client.login(server["username"], server["password"],
+                     session_cache=cache)
+        _clients[key] = client
+    return _clients[key]
+
+
 class BaseFlow(object):
     __metaclass__ = abc.ABCMeta
     name = None
@@ -32,17 +57,39 @@ class BaseFlow(object):
         pipeline, queue
         :rtype:
         """
-        # LOAD CONFIG
-        with open(join(props["working.dir"], "config.yml")) as fd:
-            config = yaml.load(fd)
-
-        client = AzkabanClient(config["server"]["host"])
-        client.login(config["server"]["username"],
-                     config["server"]["password"])
+        config = cls._load_config()
+        client = get_client(config["server"])
         return client.execute_flow(config["project"], cls.name or cls.__name__,
                                    properties,
                                    concurrentOption=concurrent_option)
 
+    @classmethod
+    def start_many(cls, properties_list, concurrent_option="skip",
+                   max_in_flight=10, rate=None):
+        """Start flow with each of properties concurrently
+
+        :param list[dict[str,str]] properties_list:
+        :param str concurrent_option: possible values ignore/skip,
+        pipeline, queue
+        :param int max_in_flight: max number of concurrent requests
+        :param float rate: max number of requests per second
+        :return: responses of server in order of properties_list
+        :rtype: list[dict]
+        """
+        config = cls._load_config()
+        client = get_client(config["server"])
+        name = cls.name or cls.__name__
+        return client.execute_flows(
+            config["project"],
+            [(name, properties) for properties in properties_list],
+            max_in_flight=max_in_flight, rate=rate,
+            concurrentOption=concurrent_option
+        )
+
+    @staticmethod
+    def _load_config():
+        return load_yaml(join(props["working.dir"], "config.yml"))
+
     def get_start_jobs(self):
         return list(BaseFlow._get_start_jobs(self))
 
@@ -0,0 +1,247 @@
+# -*- coding: utf8 -*-
+"""Export of execution history of Azkaban to local SQLite database"""
+from multiprocessing.pool import ThreadPool
+from nagini.client import FINAL_STATUSES
+from itertools import groupby
+import logging
+import sqlite3
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS executions (
+    exec_id INTEGER PRIMARY KEY,
+    project TEXT,
+    flow TEXT,
+    status TEXT,
+    submit_time INTEGER,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration INTEGER
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    exec_id INTEGER NOT NULL,
+    project TEXT,
+    flow TEXT,
+    nested_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    type TEXT,
+    status TEXT,
+    attempt INTEGER,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration INTEGER,
+    PRIMARY KEY (exec_id, nested_id)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE INDEX IF NOT EXISTS executions_flow
+    ON executions (project, flow, start_time);
+CREATE INDEX IF NOT EXISTS jobs_duration
+    ON jobs (project, flow, job, duration);
+CREATE INDEX IF NOT EXISTS jobs_start_time ON jobs (start_time);
+'''
+
+
+def _duration(start, end):
+    """Duration in milliseconds or None if node is not started or finished"""
+    if start > 0 and end > 0:
+        return end - start
+    return None
+
+
+def _percentile(values, p):
+    """Nearest-rank percentile of sorted values"""
+    return values[max(0, -(-len(values) * p // 100) - 1)]
+
+
+def iter_nodes(execution_info):
+    """Yield nodes of execution including nodes of embedded flows"""
+    nodes = list(reversed(execution_info.get("nodes", [])))
+    while nodes:
+        node = nodes.pop()
+        yield node
+        nodes.extend(reversed(node.get("nodes", [])))
+
+
+class HistoryStore(object):
+    """SQLite database of finished executions and their jobs.
+    Times are stored in milliseconds like Azkaban returns them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def last_exec_id(self):
+        """Id of execution which export is finished on, all executions
+        up to it are exported or missing on server.
+
+        :rtype: int
+        """
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'last_exec_id'").fetchone()
+        return row[0] if row else 0
+
+    def add(self, infos, last_exec_id=None):
+        """Insert executions and their jobs in one transaction
+
+        :param list[dict] infos: results of AzkabanClient.get_execution_info
+        :param int last_exec_id: new value of last_exec_id
+        """
+        with self.connection:
+            for info in infos:
+                self._add(info)
+            if last_exec_id is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('last_exec_id', ?)",
+                    (last_exec_id,))
+
+    def _add(self, info):
+        exec_id = info["execid"]
+        self.connection.execute(
+            'INSERT OR REPLACE INTO executions VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (exec_id, info.get("project"), info.get("flow"),
+             info.get("status"), info.get("submitTime"),
+             info.get("startTime"), info.get("endTime"),
+             _duration(info.get("startTime", -1), info.get("endTime", -1)))
+        )
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO jobs '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(exec_id, info.get("project"), info.get("flow"),
+              node.get("nestedId") or node["id"], node["id"],
+              node.get("type"), node.get("status"), node.get("attempt"),
+              node.get("startTime"), node.get("endTime"),
+              _duration(node.get("startTime", -1), node.get("endTime", -1)))
+             for node in iter_nodes(info)]
+        )
+
+    def job_durations(self, status='SUCCEEDED', since=None):
+        """Return duration statistics of jobs sorted by p95 descending.
+        Jobs are identified by project, flow and name, nodes of embedded
+        flows are not counted. Durations are read ordered by jobs_duration
+        index, so percentiles are computed in one pass.
+
+        :param str status: use only runs of jobs with this status, None is any
+        :param int since: use only runs started after this time (ms)
+        :return: list of (project, flow, job, number of runs, p50, p95, max),
+        durations are in seconds
+        :rtype: list[(str,str,str,int,float,float,float)]
+        """
+        where = ['duration IS NOT NULL', "(type IS NULL OR type != 'flow')"]
+        params = []
+        if status is not None:
+            where.append('status = ?')
+            params.append(status)
+        if since is not None:
+            where.append('start_time >= ?')
+            params.append(since)
+        rows = self.connection.execute(
+            'SELECT project, flow, job, duration FROM jobs WHERE %s '
+            'ORDER BY project, flow, job, duration' % ' AND '.join(where),
+            params
+        )
+        result = []
+        for key, group in groupby(rows, lambda row: row[:3]):
+            durations = [row[3] / 1000.0 for row in group]
+            result.append(key + (len(durations), _percentile(durations, 50),
+                                 _percentile(durations, 95), durations[-1]))
+        result.sort(key=lambda row: row[5], reverse=True)
+        return result
+
+
+class HistoryExporter(object):
+    """Fetch execution infos concurrently and store finished executions.
+
+    Export is resumed from HistoryStore.last_exec_id. It is advanced only
+    over finished or missing executions, so running executions are
+    fetched again by next export.
+    """
+
+    def __init__(self, client, store, workers=10, batch_size=100):
+        """
+        :param nagini.client.AzkabanClient client: logged in client
+        :param HistoryStore store:
+        :param int workers: number of concurrent requests
+        :param int batch_size: number of executions stored in one transaction
+        """
+        self.client = client
+        self.store = store
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def _fetch(self, exec_id):
+        info = self.client.get_execution_info(exec_id)
+        if info.get("error"):
+            return exec_id, None
+        return exec_id, info
+
+    def export(self, start=None, end=None, max_missing=100, progress=None):
+        """Export executions from start to end inclusive
+
+        :param int start: first exec id, next after last exported by default
+        :param int end: last exec id, if None export is stopped after
+        max_missing missing executions in a row
+        :param int max_missing: number of missing executions in a row which
+        means there are no more executions
+        :param progress: callable which is called with last fetched exec id
+        :return: number of stored executions
+        :rtype: int
+        """
+        last = self.store.last_exec_id
+        exec_id = start if start is not None else last + 1
+        # last_exec_id is advanced only if there is no gap before start and
+        # over executions which are finished or missing before finished one
+        blocked = exec_id > last + 1
+        frontier = last
+        missing = stored = 0
+        pool = ThreadPool(self.workers)
+        try:
+            while end is None or exec_id <= end:
+                stop = exec_id + self.batch_size
+                if end is not None:
+                    stop = min(stop, end + 1)
+                infos = []
+                for exec_id, info in pool.imap(self._fetch,
+                                               xrange(exec_id, stop)):
+                    if info is None:
+                        missing += 1
+                        continue
+                    missing = 0
+                    if info.get("status") in FINAL_STATUSES:
+                        infos.append(info)
+                        if not blocked:
+                            frontier = max(frontier, exec_id)
+                    else:
+                        blocked = True
+                if end is not None and stop > end and not blocked:
+                    frontier = max(frontier, end)
+                self.store.add(infos, frontier)
+                stored += len(infos)
+                exec_id = stop
+                if progress is not None:
+                    progress(stop - 1)
+                if end is None and missing >= max_missing:
+                    break
+        finally:
+            pool.terminate()
+            pool.join()
+
+        logger.info('Exported %d executions, last exec id is %d',
+                    stored, frontier)
+        return stored
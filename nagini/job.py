@@ -2,10 +2,12 @@
 from dateutil.rrule import rrule, MO, MONTHLY, WEEKLY, DAILY
 from dateutil.relativedelta import relativedelta
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from nagini.yaml_cache import load_yaml
 from nagini.fields import BaseField
-from nagini.properties import props
+from nagini.properties import props, LazyJson
 from nagini.utility import flatten
-from nagini.target import Target
+from nagini.target import Target, targets_exist
 from os.path import join, exists
 from os import mkdir, environ
 from datetime import datetime
@@ -13,8 +15,12 @@ from copy import deepcopy
 import subprocess
 import logging
 import shutil
-import json
-import yaml
+import sys
+
+
+# Longer values of props are truncated in log, full props are logged
+# only at DEBUG level
+PROPS_LOG_VALUE_SIZE = 256
 
 
 class MetaForJobWithFields(ABCMeta):
@@ -54,8 +60,9 @@ class BaseJob(object):
             props['working.dir.nagini'] = join(props['working.dir'],
                                                'nagini_data')
 
-            with open(join(props['working.dir'], 'config.yml')) as fd:
-                self.config = yaml.load(fd)
+            # Parsed once per process, copy is cheaper than parsing
+            self.config = deepcopy(
+                load_yaml(join(props['working.dir'], 'config.yml')))
 
     def requires(self):
         """Override me!"""
@@ -94,9 +101,35 @@ class BaseJob(object):
         self.logger.error("Nagini: this job is empty. Override run() method")
 
     def on_failure(self):
-        for target in flatten(self.output()):
-            if target.exists():
+        """Clean up existing output targets. Errors are logged and
+        swallowed, so they don't replace exception of the job."""
+        try:
+            targets = flatten(self.output())
+        except Exception:
+            self.logger.exception("Nagini: fail to get output of the job")
+            return
+        cleaned = []
+        checked = OrderedDict()  # type of target -> targets
+        for target in targets:
+            if target.clean_up_requires_exists:
+                checked.setdefault(type(target), []).append(target)
+            else:
+                cleaned.append(target)
+        # Failed check of one type doesn't prevent clean up of others
+        for target_type, group in checked.iteritems():
+            try:
+                cleaned += [target for target, exists
+                            in zip(group, targets_exist(group)) if exists]
+            except Exception:
+                self.logger.exception("Nagini: fail to check output "
+                                      "targets of type %s",
+                                      target_type.__name__)
+        for target in cleaned:
+            try:
                 target.clean_up()
+            except Exception:
+                self.logger.exception("Nagini: fail to clean up target %r",
+                                      target)
 
     def on_success(self):
         pass
@@ -109,32 +142,41 @@ class BaseJob(object):
         except OSError:
             pass
         self.configure()
-        self.logger.info('Init props:\n' +
-                         json.dumps(props, ensure_ascii=False,
-                                    indent=4, sort_keys=True))
+        self.logger.info('Init props: %d keys, changed since load:\n%s',
+                         len(props), LazyJson(props.diff(),
+                                              PROPS_LOG_VALUE_SIZE))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('All init props:\n%s', LazyJson(props))
         output = flatten(self.output())
         if not output:
             self._check_output_at_start = False
         try:
             self.logger.info("Nagini: start job")
-            if self._check_output_at_start and all(t.exists() for t in output):
+            if self._check_output_at_start and all(targets_exist(output)):
                 self.logger.warning("All targets exists at start "
                                     "of the job, skip job...")
             else:
                 self.logger.info('Nagini: about to execute "run" method')
                 self.run()
+                self.logger.info('Props after run, changed since load:\n%s',
+                                 LazyJson(props.diff(), PROPS_LOG_VALUE_SIZE))
             for key, value in self.env.iteritems():
                 props["env.%s" % key] = value
 
-            if self._check_output_at_end and not all(t.exists() for t in output):
+            if self._check_output_at_end and not all(targets_exist(output)):
                 raise Exception("Not all output target exists "
                                 "at end of the job")
             else:
                 self.on_success()
-        except BaseException as e:
+        except BaseException:
+            exc_info = sys.exc_info()
             self.logger.error("NaginiJob: catch exception. Try on_failure()")
-            self.on_failure()
-            raise
+            try:
+                self.on_failure()
+            except Exception:
+                # Overridden on_failure must not hide exception of the job
+                self.logger.exception("NaginiJob: on_failure() is failed")
+            raise exc_info[0], exc_info[1], exc_info[2]
 
     def rupdate_props(self, other):
         """Like self.props.update but not override existing props"""
@@ -323,6 +365,9 @@ class IntervalDataChecker(BaseJob):
     prepared_data_pattern = None
     work_flow = None
     work_flow_params = None
+    # Limits of starting of work flows for missing periods
+    max_in_flight = 10
+    max_starts_per_second = 5
 
     def run(self):
         end = None
@@ -340,6 +385,7 @@ class IntervalDataChecker(BaseJob):
             end = datetime.now() - relativedelta(hour=0, minute=0, second=0)
             start = end - relativedelta(days=self.check_interval)
 
+        periods = []
         for current in rrule(self.type, start, until=end):
             s = current
             if self.type == MONTHLY:
@@ -353,7 +399,16 @@ class IntervalDataChecker(BaseJob):
                 print 'Prepared data not exists for', s, e
                 if self.src_data_exists(s, e):
                     print "Start prepare data. Start: %s, End: %s" % (s, e)
-                    self.start_work_flow(s, e)
+                    periods.append((s, e))
+        if not periods:
+            return
+        if self.start_work_flow.__func__ is not \
+                IntervalDataChecker.start_work_flow.__func__:
+            # Subclass starts work flow in its own way
+            for s, e in periods:
+                self.start_work_flow(s, e)
+        else:
+            self.start_work_flows(periods)
 
     @abstractmethod
     def src_data_exists(self, s, e):
@@ -366,6 +421,32 @@ class IntervalDataChecker(BaseJob):
                                   '"dst_data_exists" method')
 
     def start_work_flow(self, s, e):
+        self.work_flow.start(self.get_work_flow_params(s, e))
+
+    def start_work_flows(self, periods):
+        """Start work flow for all periods at once. Error responses of
+        server are logged, other errors fail the job after all periods
+        are submitted.
+
+        :param list[(datetime,datetime)] periods: pairs of start and end
+        """
+        results = self.work_flow.start_many(
+            [self.get_work_flow_params(s, e) for s, e in periods],
+            max_in_flight=self.max_in_flight,
+            rate=self.max_starts_per_second
+        )
+        failed = []
+        for (s, e), result in zip(periods, results):
+            if result.get("error"):
+                self.logger.error("Fail to start work flow for %s: %s",
+                                  s, result["error"])
+                if result.get("exception"):
+                    failed.append(s)
+        if failed:
+            raise Exception("Fail to start work flow for %d of %d periods"
+                            % (len(failed), len(periods)))
+
+    def get_work_flow_params(self, s, e):
         params = deepcopy(self.work_flow_params) or {}
 
         if self.type == MONTHLY:
@@ -376,5 +457,4 @@ class IntervalDataChecker(BaseJob):
                            "end": e.strftime("%Y-%m-%d")})
         elif self.type == DAILY:
             params["day"] = s.strftime("%Y-%m-%d")
-
-        self.work_flow.start(params)
+        return params
@@ -0,0 +1,132 @@
+# -*- coding: utf8 -*-
+"""Ledger of jobs finished by local runner, used to resume failed runs"""
+from nagini.target import targets_exist
+from os.path import exists, dirname
+from os import makedirs, rename
+import inspect
+import hashlib
+import logging
+import json
+import time
+
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILENAME = ".nagini-ledger.json"
+# Props which differ between runs of the same job
+VOLATILE_PROPS_PREFIX = "env."
+
+
+def job_key(cls):
+    return "%s.%s" % (cls.__module__, cls.__name__)
+
+
+def code_digest(cls):
+    """Digest of source file of job class, entry is invalid if code of
+    job is changed
+
+    :rtype: str|None
+    """
+    try:
+        with open(inspect.getsourcefile(cls)) as fd:
+            return hashlib.sha1(fd.read()).hexdigest()
+    except (TypeError, IOError):
+        return None
+
+
+def props_digest(properties):
+    """Digest of props which job depends on
+
+    :param dict properties: input props of job
+    :rtype: str
+    """
+    data = dict((k, v) for k, v in properties.iteritems()
+                if not k.startswith(VOLATILE_PROPS_PREFIX))
+    return hashlib.sha1(json.dumps(data, sort_keys=True)).hexdigest()
+
+
+def target_state(target):
+    """Identity of target: class and digest of attributes, attributes
+    themselves aren't stored because they may contain passwords
+
+    :param nagini.target.Target target:
+    :rtype: str
+    """
+    # JSON doesn't distinguish str and unicode values of props
+    attributes = json.dumps(getattr(target, "__dict__", {}), sort_keys=True,
+                            default=repr)
+    return "%s.%s:%s" % (target.__class__.__module__,
+                         target.__class__.__name__,
+                         hashlib.sha1(attributes).hexdigest())
+
+
+class CompletionLedger(object):
+    """Persistent records of finished jobs: job identity, digest of input
+    props, output props and identities of output targets.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._data = {}
+        if exists(self.filename):
+            try:
+                with open(self.filename) as fd:
+                    self._data = json.load(fd)
+            except ValueError:
+                logger.warning('Ledger %s is corrupted, ignore it',
+                               self.filename)
+
+    def get(self, cls):
+        return self._data.get(job_key(cls))
+
+    def is_valid(self, cls, input_props, targets):
+        """Return True if job was finished with the same code and input
+        props and all its output targets still exist
+
+        :param type cls: class of job
+        :param dict input_props:
+        :param list[nagini.target.Target] targets: output of job
+        :rtype: bool
+        """
+        entry = self.get(cls)
+        if entry is None:
+            return False
+        if entry["code"] != code_digest(cls) or \
+                entry["input"] != props_digest(input_props):
+            return False
+        if entry["targets"] != sorted(target_state(t) for t in targets):
+            return False
+        return all(targets_exist(targets))
+
+    def record(self, cls, input_props, output_props, targets):
+        """
+        :param type cls: class of job
+        :param dict input_props:
+        :param dict output_props:
+        :param list[str] targets: states of output targets (target_state)
+        """
+        self._data[job_key(cls)] = {
+            "code": code_digest(cls),
+            "input": props_digest(input_props),
+            "output": output_props,
+            "targets": sorted(targets),
+            "finished": time.time(),
+        }
+        self.save()
+
+    def discard(self, cls):
+        """Drop entry of job which is executed again, so entry of
+        previous run isn't used if job fails
+
+        :param type cls: class of job
+        """
+        if self._data.pop(job_key(cls), None) is not None:
+            self.save()
+
+    def save(self):
+        if dirname(self.filename) and not exists(dirname(self.filename)):
+            makedirs(dirname(self.filename))
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as fd:
+            json.dump(self._data, fd, indent=2, sort_keys=True)
+        rename(tmp_filename, self.filename)
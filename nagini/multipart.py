@@ -0,0 +1,102 @@
+# -*- coding: utf8 -*-
+from uuid import uuid4
+import os
+
+
+class MultipartEncoder(object):
+    """File-like multipart/form-data body. HTTP client reads body through
+    read() by blocks of its own size (8 KB in httplib), files are read by
+    these blocks too, so memory usage doesn't depend on size of files.
+    """
+
+    def __init__(self, fields=None, files=None):
+        """
+        :param dict[str,str] fields: form fields
+        :param dict[str,(str,file,str)] files: name -> (filename, file object,
+        content type), file objects must be opened in binary mode
+        """
+        self.boundary = uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+        self.bytes_read = 0
+        self._parts = []  # str or (file, size)
+
+        for name, value in sorted((fields or {}).iteritems()):
+            self._parts.append(
+                '--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n'
+                '%s\r\n' % (self.boundary, _encode(name), _encode(value))
+            )
+        for name, (filename, fd, content_type) in sorted(
+                (files or {}).iteritems()):
+            self._parts.append(
+                '--%s\r\nContent-Disposition: form-data; name="%s"; '
+                'filename="%s"\r\nContent-Type: %s\r\n\r\n' % (
+                    self.boundary, _encode(name), _encode(filename),
+                    content_type
+                )
+            )
+            self._parts.append((fd, os.fstat(fd.fileno()).st_size - fd.tell()))
+            self._parts.append('\r\n')
+        self._parts.append('--%s--\r\n' % self.boundary)
+
+        self.len = sum(len(p) if isinstance(p, str) else p[1]
+                       for p in self._parts)
+        self._starts = [p[0].tell() for p in self._parts
+                        if not isinstance(p, str)]
+        self._index = 0
+        self._offset = 0
+
+    def __len__(self):
+        return self.len
+
+    def tell(self):
+        return self.bytes_read
+
+    def seek(self, offset, whence=0):
+        """Only rewinding to the start and seeking to the end are supported,
+        the latter is used by requests to get length of body"""
+        if offset == 0 and whence == 2:
+            self._index = len(self._parts)
+            self._offset = 0
+            self.bytes_read = self.len
+            return
+        if offset != 0 or whence != 0:
+            raise IOError('MultipartEncoder can be rewound only to start')
+        starts = iter(self._starts)
+        for part in self._parts:
+            if not isinstance(part, str):
+                part[0].seek(next(starts))
+        self._index = 0
+        self._offset = 0
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len - self.bytes_read
+        chunks = []
+        while size > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, str):
+                chunk = part[self._offset:self._offset + size]
+                part_size = len(part)
+            else:
+                chunk = part[0].read(min(size, part[1] - self._offset))
+                part_size = part[1]
+                if not chunk and self._offset < part_size:
+                    raise IOError('File is truncated while uploading')
+
+            chunks.append(chunk)
+            size -= len(chunk)
+            self._offset += len(chunk)
+            if self._offset >= part_size:
+                self._index += 1
+                self._offset = 0
+
+        data = ''.join(chunks)
+        self.bytes_read += len(data)
+        return data
+
+
+def _encode(value):
+    if isinstance(value, unicode):
+        return value.encode('utf8')
+    return str(value)
@@ -8,8 +8,38 @@ import os
 logger = logging.getLogger('nagini.properties')
 
 
+class LazyJson(object):
+    """Log argument which is serialized only when record is emitted"""
+
+    def __init__(self, data, max_value_size=None):
+        """
+        :param dict data:
+        :param int max_value_size: longer string values are truncated
+        """
+        self.data = data
+        self.max_value_size = max_value_size
+
+    def _truncate(self, value):
+        if isinstance(value, basestring) and \
+                len(value) > self.max_value_size:
+            return u'%s... (%d chars)' % (value[:self.max_value_size],
+                                          len(value))
+        return value
+
+    def __str__(self):
+        data = self.data
+        if self.max_value_size is not None:
+            data = dict((k, self._truncate(v)) for k, v in data.iteritems())
+        result = json.dumps(data, ensure_ascii=False, indent=4,
+                            sort_keys=True)
+        if isinstance(result, unicode):
+            result = result.encode('utf8')
+        return result
+
+
 class Properties(dict):
     FLOAT_RE = r'^\d+\.\d*$'
+    _loaded = {}  # props at the moment of load
 
     def load(self, filename=None, clear=True):
         if filename is None:
@@ -27,6 +57,18 @@ class Properties(dict):
                 if not line.startswith('#'):
                     name, value = line.split('=', 1)
                     self[name] = value.replace(r'\:', ':')
+        self._loaded = dict(self)
+
+    def diff(self):
+        """Return props changed since load, removed props are None
+
+        :rtype: dict
+        """
+        loaded = self._loaded
+        result = dict((k, v) for k, v in self.iteritems()
+                      if k not in loaded or loaded[k] != v)
+        result.update((k, None) for k in loaded if k not in self)
+        return result
 
     def dump(self, filename=None):
         if filename is None:
@@ -0,0 +1,279 @@
+# -*- coding: utf8 -*-
+"""Local runner which executes DAG of jobs like Azkaban does.
+
+Every job is executed in its own process, job which process exits
+without result, e.g. killed by OOM killer, is failed. Input props of job are
+union of output props of its requirements, so props are passed along
+edges of DAG. Finished jobs are recorded to ledger in working dir, so
+failed run can be resumed.
+"""
+from nagini.ledger import CompletionLedger, LEDGER_FILENAME, target_state
+from nagini.properties import props
+from nagini.utility import flatten
+from os.path import join
+import multiprocessing
+import traceback
+import tempfile
+import logging
+import shutil
+import json
+import time
+import os
+
+
+logger = logging.getLogger(__name__)
+
+# Jobs of running DAG, set before worker processes are forked
+_jobs = []
+
+
+class JobFailed(Exception):
+    pass
+
+
+def build_dag(root):
+    """Return deduplicated DAG of jobs required by root.
+    Jobs are identified by class like in built project.
+
+    :param nagini.BaseJob|nagini.BaseFlow root:
+    :return: classes of jobs in topological order, requirements first, and
+    classes of requirements of every job
+    :rtype: (list[type], dict[type,list[type]])
+    """
+    order = []
+    parents = {}
+    visiting = set()
+    stack = [(root, False)]
+    while stack:
+        job, expanded = stack.pop()
+        cls = job.__class__
+        if expanded:
+            visiting.discard(cls)
+            order.append(cls)
+            continue
+        if cls in parents:
+            if cls in visiting:
+                raise ValueError('Cycle in requires() of %s' % cls.__name__)
+            continue
+
+        requires = []
+        for parent in flatten(job.requires()):
+            if parent.__class__ not in requires:
+                requires.append(parent.__class__)
+                stack.append((parent, False))
+        parents[cls] = requires
+        visiting.add(cls)
+        # Marker is popped after all requirements
+        stack.insert(len(stack) - len(requires), (job, True))
+    return order, parents
+
+
+def _execute_job(index, input_file, output_file):
+    """Execute job in worker process like launcher of built project does"""
+    try:
+        os.environ["JOB_PROP_FILE"] = input_file
+        os.environ["JOB_OUTPUT_PROP_FILE"] = output_file
+        props.load(input_file)
+        job = _jobs[index]()
+        job.execute()
+        props.dump(output_file)
+        return None, [target_state(t) for t in flatten(job.output())]
+    except BaseException:
+        return traceback.format_exc(), None
+
+
+def _run_job(index, input_file, output_file, connection):
+    """Entry point of job process, result is sent to runner"""
+    connection.send(_execute_job(index, input_file, output_file))
+    connection.close()
+
+
+def write_input_props(filename, properties):
+    with open(filename, "w") as fd:
+        for name, value in sorted(properties.iteritems()):
+            fd.write(u"{0}={1}\n".format(name, value).encode("utf8"))
+
+
+class LocalRunner(object):
+    # Interval of checking of running processes in seconds
+    poll_interval = 0.05
+
+    def __init__(self, root, workers=1, working_dir=None, properties=None,
+                 resume=False):
+        """
+        :param nagini.BaseJob|nagini.BaseFlow root: last job or flow
+        :param int workers: max number of jobs executed concurrently
+        :param str working_dir: value of "working.dir" prop, current
+        directory by default
+        :param dict properties: input props of jobs without requirements
+        :param bool resume: skip jobs which are finished by previous run
+        with the same input props and which output targets exist, if all
+        their requirements are skipped too
+        """
+        self.order, self.parents = build_dag(root)
+        self.index = dict((cls, i) for i, cls in enumerate(self.order))
+        self.children = dict((cls, []) for cls in self.order)
+        for cls in self.order:
+            for parent in self.parents[cls]:
+                self.children[parent].append(cls)
+        self.workers = workers
+        self.working_dir = working_dir or os.getcwd()
+        self.properties = {"working.dir": self.working_dir}
+        self.properties.update(properties or {})
+        self.resume = resume
+        self.ledger = CompletionLedger(join(self.working_dir,
+                                            LEDGER_FILENAME))
+        self.props_dir = None
+        self._inputs = {}  # class of running job -> input props
+
+    def input_props(self, cls):
+        """Return input props of job: union of outputs of requirements"""
+        result = dict(self.properties)
+        for parent in self.parents[cls]:
+            with open(self.output_file(parent)) as fd:
+                result.update(json.load(fd))
+        return result
+
+    def _props_file(self, cls, suffix):
+        # Index prevents collisions of classes with the same name
+        return join(self.props_dir, "%d.%s.%s" % (self.index[cls],
+                                                  cls.__name__, suffix))
+
+    def output_file(self, cls):
+        return self._props_file(cls, "output.json")
+
+    def is_finished(self, cls, input_props):
+        """Check ledger entry of job, output of job is evaluated with
+        its input props like in worker process"""
+        if self.ledger.get(cls) is None:
+            return False
+        saved = dict(props)
+        props.clear()
+        props.update(input_props)
+        try:
+            job = cls()
+            job.configure()
+            targets = flatten(job.output())
+            return self.ledger.is_valid(cls, input_props, targets)
+        except Exception:
+            logger.warning("Fail to check output of job %s", cls.__name__,
+                           exc_info=True)
+            return False
+        finally:
+            props.clear()
+            props.update(saved)
+
+    def _skip(self, cls):
+        logger.info("Skip job %s, it is finished by previous run",
+                    cls.__name__)
+        with open(self.output_file(cls), "w") as fd:
+            json.dump(self.ledger.get(cls)["output"], fd)
+
+    def _submit(self, cls, input_props, running):
+        input_file = self._props_file(cls, "input.properties")
+        write_input_props(input_file, input_props)
+        self._inputs[cls] = input_props
+        self.ledger.discard(cls)
+        logger.info("Start job %s", cls.__name__)
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_run_job,
+            args=(self.index[cls], input_file, self.output_file(cls), writer)
+        )
+        process.start()
+        writer.close()
+        running[cls] = (process, reader, time.time())
+
+    def _wait(self, running):
+        """Wait until any running job is finished and remove it from
+        running. Job which process exited without result is failed.
+
+        :return: class of job, (error, target states) and elapsed time
+        """
+        while True:
+            for cls, (process, reader, start) in running.items():
+                # Result is sent before exit, so liveness is checked first.
+                # Reader is also ready when process exited without result.
+                alive = process.is_alive()
+                if not reader.poll() and alive:
+                    continue
+                try:
+                    result = reader.recv()
+                except EOFError:
+                    result = None
+                process.join()
+                reader.close()
+                del running[cls]
+                if result is None:
+                    result = ("Process of job exited with code %s without "
+                              "result" % process.exitcode, None)
+                return cls, result, time.time() - start
+            time.sleep(self.poll_interval)
+
+    def run(self):
+        """Execute all jobs, requirements of job are finished before it.
+        After first failure no new jobs are started.
+
+        :raises JobFailed: if some jobs are failed
+        """
+        global _jobs
+        _jobs = self.order
+        waiting = dict((cls, len(self.parents[cls])) for cls in self.order)
+        ready = [cls for cls in self.order if not waiting[cls]]
+        failed = []
+        executed = set()  # jobs which outputs are produced by this run
+        running = {}  # class of job -> (process, result reader, start time)
+        done = 0
+
+        self.props_dir = tempfile.mkdtemp(prefix="nagini-run-props-")
+        try:
+            while ready or running:
+                while ready and not failed and len(running) < self.workers:
+                    cls = ready.pop(0)
+                    input_props = self.input_props(cls)
+                    # Job is executed again if any requirement is executed
+                    if self.resume and \
+                            executed.isdisjoint(self.parents[cls]) and \
+                            self.is_finished(cls, input_props):
+                        self._skip(cls)
+                        done += 1
+                        ready.extend(self._release(cls, waiting))
+                    else:
+                        self._submit(cls, input_props, running)
+                        executed.add(cls)
+                if not running:
+                    break
+
+                cls, (error, targets), elapsed = self._wait(running)
+                if error is not None:
+                    logger.error("Job %s is failed in %.1f s:\n%s",
+                                 cls.__name__, elapsed, error)
+                    failed.append(cls)
+                    continue
+                done += 1
+                logger.info("Job %s is finished in %.1f s (%d/%d)",
+                            cls.__name__, elapsed, done, len(self.order))
+                with open(self.output_file(cls)) as fd:
+                    self.ledger.record(cls, self._inputs.pop(cls),
+                                       json.load(fd), targets)
+                ready.extend(self._release(cls, waiting))
+        finally:
+            for process, reader, _ in running.itervalues():
+                process.terminate()
+                process.join()
+                reader.close()
+
+        if failed:
+            logger.error("Props of jobs are kept in %s", self.props_dir)
+            raise JobFailed("Failed jobs: %s" % ", ".join(
+                cls.__name__ for cls in failed))
+        shutil.rmtree(self.props_dir)
+
+    def _release(self, cls, waiting):
+        """Return jobs which have no more unfinished requirements"""
+        released = []
+        for child in self.children[cls]:
+            waiting[child] -= 1
+            if not waiting[child]:
+                released.append(child)
+        return released
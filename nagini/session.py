@@ -0,0 +1,94 @@
+# -*- coding: utf8 -*-
+from contextlib import contextmanager
+from os.path import exists
+from threading import Lock
+import logging
+import fcntl
+import json
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache(object):
+    """Cache of Azkaban session ids.
+
+    Session ids are shared by all clients of the process and, if filename
+    is set, by all processes using the same file (e.g. jobs of one
+    execution). The file is locked while it is read or written.
+    """
+    _memory = {}  # "host|username" -> session id, shared in process
+    _memory_lock = Lock()
+
+    def __init__(self, filename=None):
+        self.filename = filename
+
+    @staticmethod
+    def _key(host, username):
+        return '%s|%s' % (host, username)
+
+    def get(self, host, username):
+        """Return cached session id or None
+
+        :rtype: str|None
+        """
+        key = self._key(host, username)
+        with self._memory_lock:
+            session_id = self._memory.get(key)
+        if session_id is None and self.filename:
+            with self._locked(fcntl.LOCK_SH):
+                session_id = self._read().get(key)
+            if session_id is not None:
+                with self._memory_lock:
+                    self._memory[key] = session_id
+        return session_id
+
+    def set(self, host, username, session_id):
+        key = self._key(host, username)
+        with self._memory_lock:
+            self._memory[key] = session_id
+        if self.filename:
+            with self._locked(fcntl.LOCK_EX):
+                sessions = self._read()
+                sessions[key] = session_id
+                self._write(sessions)
+
+    def invalidate(self, host, username, session_id):
+        """Forget session id if it is still cached"""
+        key = self._key(host, username)
+        with self._memory_lock:
+            if self._memory.get(key) == session_id:
+                del self._memory[key]
+        if self.filename:
+            with self._locked(fcntl.LOCK_EX):
+                sessions = self._read()
+                if sessions.get(key) == session_id:
+                    del sessions[key]
+                    self._write(sessions)
+
+    @contextmanager
+    def _locked(self, operation):
+        fd = os.open(self.filename + '.lock', os.O_RDWR | os.O_CREAT, 0600)
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read(self):
+        if not exists(self.filename):
+            return {}
+        try:
+            with open(self.filename) as fd:
+                return json.load(fd)
+        except ValueError:
+            logger.warning('Session cache %s is corrupted, ignore it',
+                           self.filename)
+            return {}
+
+    def _write(self, sessions):
+        fd = os.open(self.filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                     0600)
+        with os.fdopen(fd, 'w') as fo:
+            json.dump(sessions, fo)
@@ -1,28 +1,130 @@
 # -*- coding: utf8 -*-
+from multiprocessing.pool import ThreadPool
+from collections import OrderedDict
 from subprocess import check_output
+from threading import Lock
+import logging
 import abc
 import os
 
 
+logger = logging.getLogger(__name__)
+
+_NOT_IMPORTED = object()
+_driver = _NOT_IMPORTED
+
+
+def _mysql_driver():
+    """Import MySQLdb or pymysql on first query, so jobs which don't use
+    MySqlTarget don't pay for import of driver
+
+    :return: module of driver or None if mysql client is used
+    """
+    global _driver
+    if _driver is _NOT_IMPORTED:
+        try:
+            import MySQLdb as driver
+        except ImportError:
+            try:
+                import pymysql as driver
+            except ImportError:
+                driver = None
+        _driver = driver
+    return _driver
+
+
+def targets_exist(targets):
+    """Check existence of targets grouped by type of target, every group
+    is checked by exists_many of its type
+
+    :param list[Target] targets:
+    :return: existence of every target in the same order
+    :rtype: list[bool]
+    """
+    groups = OrderedDict()
+    for i, target in enumerate(targets):
+        groups.setdefault(type(target), []).append(i)
+    result = [False] * len(targets)
+    for target_type, indexes in groups.iteritems():
+        exist = target_type.exists_many([targets[i] for i in indexes])
+        for i, exists in zip(indexes, exist):
+            result[i] = bool(exists)
+    return result
+
+
 class Target(object):
     __metaclass__ = abc.ABCMeta
+    # Max number of concurrent checks in default exists_many
+    exists_workers = 8
+    # Existence is checked before clean_up on failure of job, disable it
+    # if clean_up of missing target is harmless
+    clean_up_requires_exists = True
 
     @abc.abstractmethod
     def exists(self):
         return False
 
+    @classmethod
+    def exists_many(cls, targets):
+        """Check existence of many targets of this type at once.
+        Override it if targets can be checked in bulk, e.g. by one query,
+        by default exists() of targets is called concurrently.
+
+        :param list[Target] targets:
+        :rtype: list[bool]
+        """
+        if len(targets) <= 1:
+            return [t.exists() for t in targets]
+        pool = ThreadPool(min(len(targets), cls.exists_workers))
+        try:
+            return pool.map(lambda t: t.exists(), targets)
+        finally:
+            pool.close()
+            pool.join()
+
     @abc.abstractmethod
     def clean_up(self):
         pass
 
 
 class LocalTarget(Target):
+    # Directory is listed when it contains at least such number of targets,
+    # otherwise targets are checked one by one
+    list_dir_threshold = 8
+
     def __init__(self, path):
         self.path = path
 
     def exists(self):
         return os.path.exists(self.path)
 
+    @classmethod
+    def exists_many(cls, targets):
+        """Targets are grouped by directory, directory with many targets
+        is listed once instead of checking every target. Unlike exists(),
+        broken symlink in listed directory is considered existing.
+        Subclass which overrides exists() is checked by its exists()."""
+        if cls.exists.__func__ is not LocalTarget.exists.__func__:
+            return super(LocalTarget, cls).exists_many(targets)
+        dirs = {}
+        for i, target in enumerate(targets):
+            directory, name = os.path.split(os.path.normpath(target.path))
+            dirs.setdefault(directory, []).append((i, name))
+
+        result = [False] * len(targets)
+        for directory, items in dirs.iteritems():
+            if len(items) < cls.list_dir_threshold:
+                for i, _ in items:
+                    result[i] = targets[i].exists()
+                continue
+            try:
+                names = set(os.listdir(directory or os.curdir))
+            except OSError:
+                continue  # directory doesn't exist
+            for i, name in items:
+                result[i] = name in names
+        return result
+
     def open(self, mode="r"):
         if mode == "w":
             # Create folder if it does not exist
@@ -42,9 +144,128 @@ class LocalTarget(Target):
         return int(lines.split()[0])
 
 
+def _quote_name(name):
+    """Quote table name which may be prefixed with database"""
+    return '.'.join('`%s`' % part.replace('`', '``')
+                    for part in name.split('.'))
+
+
+def _literal(value):
+    if isinstance(value, unicode):
+        value = value.encode('utf8')
+    return "'%s'" % str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+
+class MySqlConnection(object):
+    """Connection shared by all targets with the same parameters. MySQLdb
+    or pymysql is used if installed, otherwise every query is executed by
+    mysql client.
+    """
+    _connections = {}
+    _connections_lock = Lock()
+
+    def __init__(self, host=None, port=None, user=None, password=None,
+                 config_file=None, db=None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.config_file = config_file
+        self.db = db
+        self._connection = None
+        self._lock = Lock()
+
+    @classmethod
+    def get(cls, **params):
+        key = tuple(sorted(params.iteritems()))
+        with cls._connections_lock:
+            if key not in cls._connections:
+                cls._connections[key] = cls(**params)
+            return cls._connections[key]
+
+    def _connect(self):
+        kwargs = {'charset': 'utf8'}
+        if self.config_file:
+            kwargs['read_default_file'] = self.config_file
+        for name, value in (('host', self.host), ('user', self.user),
+                            ('passwd', self.password), ('db', self.db)):
+            if value is not None:
+                kwargs[name] = value
+        if self.port is not None:
+            kwargs['port'] = int(self.port)
+        connection = _mysql_driver().connect(**kwargs)
+        # Don't read from snapshot of long transaction
+        connection.autocommit(True)
+        return connection
+
+    def query(self, sql):
+        """Execute query and return all rows
+
+        :rtype: list[tuple]
+        """
+        driver = _mysql_driver()
+        if driver is None:
+            return self._query_client(sql)
+        with self._lock:
+            for attempt in (0, 1):
+                if self._connection is None:
+                    self._connection = self._connect()
+                try:
+                    cursor = self._connection.cursor()
+                    try:
+                        cursor.execute(sql)
+                        return list(cursor.fetchall())
+                    finally:
+                        cursor.close()
+                except driver.OperationalError:
+                    # Connection is lost, reconnect once
+                    self.close()
+                    if attempt:
+                        raise
+
+    def _query_client(self, sql):
+        args = ["mysql"]
+        if self.config_file:
+            args.append("--defaults-extra-file=%s" % self.config_file)
+        else:
+            args += ["--host=%s" % self.host, "--port=%s" % str(self.port),
+                     "--user=%s" % self.user, "--password=%s" % self.password]
+        if self.db:
+            args.append("--database=%s" % self.db)
+        args += ["--default-character-set=utf8", "--batch",
+                 "--skip-column-names", "-e", sql]
+        output = check_output(args)
+        return [tuple(line.split('\t')) for line in output.splitlines()]
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
 class MySqlTarget(Target):
+    """Table in MySQL.
+
+    Target exists if table exists and, if they are set, table has at least
+    min_rows rows matching marker condition. Existing targets are cached
+    in process, so they are checked once per job run.
+    """
+    _exists_cache = set()
+    # clean_up only drops cache entry, no query is needed on failure
+    clean_up_requires_exists = False
+
     def __init__(self, table, db=None, host=None, port=None, user=None,
-                 password=None, config_file=None, clear=False, fields=None):
+                 password=None, config_file=None, clear=False, fields=None,
+                 min_rows=None, marker=None):
+        """
+        :param str table: name of table, may be prefixed with database
+        :param int min_rows: min number of rows matching marker
+        :param str marker: SQL condition of rows which must exist, e.g.
+        "dt = '2016-01-01'"
+        """
         self.table = table
         self.db = db
         self.host = host
@@ -54,9 +275,97 @@ class MySqlTarget(Target):
         self.config_file = config_file
         self.clear = clear
         self.fields = fields
+        self.min_rows = min_rows
+        self.marker = marker
+
+    def connection(self):
+        return MySqlConnection.get(host=self.host, port=self.port,
+                                   user=self.user, password=self.password,
+                                   config_file=self.config_file, db=self.db)
+
+    def _cache_key(self):
+        return (self.host, self.port, self.config_file, self.db, self.table,
+                self.min_rows, self.marker)
+
+    def _schema_and_name(self):
+        if '.' in self.table:
+            return tuple(self.table.split('.', 1))
+        return self.db, self.table
+
+    def _rows_query(self, schema, name):
+        """Query which returns number of rows up to min_rows"""
+        return "SELECT COUNT(*) FROM (SELECT 1 FROM %s.%s%s LIMIT %d) t" % (
+            _quote_name(schema), _quote_name(name),
+            " WHERE %s" % self.marker if self.marker else "",
+            self.min_rows or 1
+        )
 
     def exists(self):
-        return False
+        return self._exists_many([self])[0]
+
+    @classmethod
+    def exists_many(cls, targets):
+        """Targets are checked by two queries per connection: one for
+        existence of all tables and one for rows of all tables. Subclass
+        which overrides exists() is checked by its exists()."""
+        if cls.exists.__func__ is not MySqlTarget.exists.__func__:
+            return super(MySqlTarget, cls).exists_many(targets)
+        return cls._exists_many(targets)
+
+    @classmethod
+    def _exists_many(cls, targets):
+        result = [False] * len(targets)
+        groups = {}
+        for i, target in enumerate(targets):
+            if target._cache_key() in cls._exists_cache:
+                result[i] = True
+            else:
+                groups.setdefault(target.connection(), []).append(i)
+
+        for connection, indexes in groups.iteritems():
+            names = [targets[i]._schema_and_name() for i in indexes]
+            if all(s for s, n in names):
+                schema = None
+            else:
+                schema = connection.query("SELECT DATABASE()")[0][0]
+            names = [(s or schema, n) for s, n in names]
+            conditions = [
+                "(TABLE_SCHEMA = %s AND TABLE_NAME = %s)" % (_literal(s),
+                                                             _literal(n))
+                for s, n in set(names) if s not in (None, 'NULL')
+            ]
+            tables = set()
+            if conditions:
+                tables = set(tuple(row) for row in connection.query(
+                    "SELECT TABLE_SCHEMA, TABLE_NAME FROM information_schema."
+                    "TABLES WHERE " + " OR ".join(conditions)
+                ))
+            existing = [(i, name) for i, name in zip(indexes, names)
+                        if name in tables]
+            predicates = [(i, name) for i, name in existing
+                          if targets[i].min_rows or targets[i].marker]
+            counts = {}
+            if predicates:
+                counts = dict(
+                    (int(i), int(count)) for i, count in connection.query(
+                        " UNION ALL ".join(
+                            "SELECT %d, (%s)" % (
+                                i, targets[i]._rows_query(*name))
+                            for i, name in predicates
+                        )
+                    )
+                )
+            for i, _ in existing:
+                target = targets[i]
+                if i in counts and counts[i] < (target.min_rows or 1):
+                    continue
+                result[i] = True
+                cls._exists_cache.add(target._cache_key())
+        return result
+
+    @classmethod
+    def clear_cache(cls):
+        cls._exists_cache.clear()
 
     def clean_up(self):
-        pass
+        self._exists_cache.discard(self._cache_key())
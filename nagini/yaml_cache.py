@@ -0,0 +1,55 @@
+# -*- coding: utf8 -*-
+"""Process-wide cache of parsed YAML files.
+
+File is parsed again only when its mtime or size is changed. Parsed data
+is shared by all callers, so it must not be modified, use copy.deepcopy
+to get mutable copy.
+"""
+from threading import Lock
+from os.path import abspath
+import os
+
+import yaml
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+
+class Loader(_SafeLoader):
+    """Safe loader which also loads strings dumped by yaml.dump"""
+
+
+Loader.add_constructor(u'tag:yaml.org,2002:python/unicode',
+                       lambda loader, node: loader.construct_scalar(node))
+Loader.add_constructor(u'tag:yaml.org,2002:python/str',
+                       Loader.construct_yaml_str)
+
+_cache = {}  # path -> ((mtime, size), data)
+_lock = Lock()
+
+
+def load_yaml(filename):
+    """Return parsed content of YAML file
+
+    :param str filename:
+    :raises OSError: if file doesn't exist
+    """
+    path = abspath(filename)
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+    with _lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(path) as fd:
+        data = yaml.load(fd, Loader=Loader)
+    with _lock:
+        _cache[path] = (key, data)
+    return data
+
+
+def clear():
+    with _lock:
+        _cache.clear()
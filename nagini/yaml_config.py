@@ -1,5 +1,7 @@
 # -*- coding: utf8 -*-
+from nagini.yaml_cache import load_yaml
 from os.path import expanduser, exists
+from copy import deepcopy
 import logging
 import yaml
 
@@ -11,8 +13,7 @@ class YamlConfig(object):
     def __init__(self, filename='/etc/nagini.other.yml'):
         self.filename = expanduser(filename)
         if exists(self.filename):
-            with open(self.filename) as fd:
-                self._data = yaml.load(fd)
+            self._data = deepcopy(load_yaml(self.filename)) or {}
         else:
             self._data = {}
 
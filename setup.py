@@ -23,7 +23,8 @@ setup(
     author='Alexandr Litovchenko',
     author_email='zedlaa@gmail.com',
     packages=['nagini', 'nagini.builder'],
-    scripts=['nagini-build.py', 'nagini-run.py', 'nagini-data.py'],
+    scripts=['nagini-build.py', 'nagini-run.py', 'nagini-data.py',
+             'nagini-history.py'],
     requires=['jinja2', 'requests', 'PyYAML'],
     data_files=[
         ('/usr/share/nagini/', ['data/job-template.job.j2']),
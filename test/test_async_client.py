@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+from benchmarks.fake_azkaban import FakeAzkaban
+from nagini.async_client import AsyncAzkabanClient
+from threading import Lock
+import unittest
+
+
+class AsyncClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeAzkaban(jobs=2).start()
+        self.client = AsyncAzkabanClient(self.server.url, max_connections=4)
+        self.client.login('user', 'password').get(5)
+        self.client.create_project('project').get(5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def execute(self, n):
+        results = self.client.map('execute_flow',
+                                  [('project', 'flow')] * n)
+        return [r['execid'] for r in self.client.gather(results, timeout=5)]
+
+    def test_map_and_gather(self):
+        exec_ids = self.execute(5)
+        self.assertEqual(len(set(exec_ids)), 5)
+        statuses = self.client.wait_for_executions(exec_ids).get(10)
+        self.assertEqual(statuses, dict((i, 'SUCCEEDED') for i in exec_ids))
+        infos = self.client.gather(
+            self.client.map('get_execution_info', [(i,) for i in exec_ids]),
+            timeout=5
+        )
+        self.assertEqual([info['execid'] for info in infos], exec_ids)
+
+    def test_callback(self):
+        exec_ids = self.execute(3)
+        called = []
+        lock = Lock()
+
+        def callback(info):
+            with lock:
+                called.append(info['execid'])
+
+        results = self.client.map('get_execution_info',
+                                  [(i,) for i in exec_ids], callback=callback)
+        self.client.gather(results, timeout=5)
+        self.assertEqual(sorted(called), sorted(exec_ids))
+
+    def test_error_is_raised_by_gather(self):
+        results = [self.client.get_execution_info(1),
+                   self.client.upload_project_zip('project', '/missing.zip')]
+        self.assertRaises(IOError, self.client.gather, results, 5)
+
+    def test_close(self):
+        self.execute(2)
+        adapter = self.client.client.session.get_adapter(self.server.url)
+        self.assertTrue(adapter.poolmanager.pools)
+        with self.client:
+            pass
+        self.assertFalse(adapter.poolmanager.pools)
+        self.assertRaises(Exception, self.client.execute_flow,
+                          'project', 'flow')
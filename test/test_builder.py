@@ -0,0 +1,332 @@
+# -*- coding: utf8 -*-
+from nagini.builder.parallel import build_projects
+from nagini.builder.package import ProjectPackage
+from nagini.builder.manifest import UploadManifest, zip_digest
+from nagini.builder.wrappers import FlowWrapper
+from nagini.builder.profiler import Profiler
+from nagini.builder.cache import BuildCache
+from nagini import BaseJob, BaseFlow
+from os.path import join
+from textwrap import dedent
+from os import mkdir
+import tempfile
+import unittest
+import zipfile
+import json
+import shutil
+import sys
+
+
+JOBS_MODULE = '''\
+from nagini import BaseJob
+
+
+class FirstJob(BaseJob):
+    pass
+
+
+class SecondJob(BaseJob):
+    def requires(self):
+        return FirstJob()
+'''
+
+FLOWS_MODULE = '''\
+from nagini import BaseFlow
+from {project}.jobs import SecondJob
+
+
+class TestFlow(BaseFlow):
+    def requires(self):
+        return SecondJob()
+'''
+
+
+class BuilderTestCase(unittest.TestCase):
+    project_counter = 0
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='nagini-test-')
+        BuilderTestCase.project_counter += 1
+        self.name = 'test_project_%d' % BuilderTestCase.project_counter
+        self.project_path = join(self.root, self.name)
+        mkdir(self.project_path)
+        self.write_module('__init__.py', '')
+        self.write_module('jobs.py', JOBS_MODULE)
+        self.write_module('flows.py', FLOWS_MODULE.format(project=self.name))
+        self.packages = []
+
+    def tearDown(self):
+        for package in self.packages:
+            package.clear()
+        shutil.rmtree(self.root)
+        for name in sys.modules.keys():
+            if name.startswith(self.name):
+                del sys.modules[name]
+
+    def write_module(self, filename, content):
+        with open(join(self.project_path, filename), 'w') as fd:
+            fd.write(dedent(content))
+
+    def build(self, config=None, **kwargs):
+        for name in sys.modules.keys():
+            if name.startswith(self.name):
+                del sys.modules[name]
+        package = ProjectPackage(self.project_path, **kwargs)
+        package.build(config=config)
+        self.packages.append(package)
+        return package
+
+    def read_generated(self, package, filename):
+        return zipfile.ZipFile(package.zip_path).read(filename)
+
+
+class ProjectPackageTest(BuilderTestCase):
+    def test_siblings_dont_shadow_modules(self):
+        self.assertNotIn('colorsys', sys.modules)
+        with open(join(self.root, 'colorsys.py'), 'w') as fd:
+            fd.write('raise ImportError("shadowed")\n')
+        self.write_module('jobs.py', 'import colorsys\n' + JOBS_MODULE)
+        try:
+            package = self.build()
+        finally:
+            sys.modules.pop('colorsys', None)
+
+        self.assertIn('dependencies=FirstJob',
+                      self.read_generated(package, 'SecondJob.job'))
+        self.assertNotIn(self.root, sys.path)
+
+
+class BuildCacheTest(BuilderTestCase):
+    def make_cache(self):
+        return BuildCache(join(self.root, 'cache'), self.project_path)
+
+    def test_unchanged_modules_are_not_imported(self):
+        self.build(cache=self.make_cache())
+        package = self.build(cache=self.make_cache())
+
+        self.assertNotIn(self.name + '.flows', sys.modules)
+        self.assertNotIn(self.name + '.jobs', sys.modules)
+        self.assertIn('dependencies=FirstJob',
+                      self.read_generated(package, 'SecondJob.job'))
+        self.assertIn('dependencies=SecondJob',
+                      self.read_generated(package, 'TestFlow.job'))
+        self.assertIn('FirstJob',
+                      json.loads(self.read_generated(package,
+                                                     'nagini_jobs.json')))
+
+    def test_changed_dependency_invalidates_flow(self):
+        self.build(cache=self.make_cache())
+        self.write_module('jobs.py', JOBS_MODULE + dedent('''\
+
+
+        class ThirdJob(BaseJob):
+            def requires(self):
+                return SecondJob()
+        '''))
+        package = self.build(cache=self.make_cache())
+
+        self.assertIn(self.name + '.flows', sys.modules)
+        self.assertIn('dependencies=SecondJob',
+                      self.read_generated(package, 'TestFlow.job'))
+
+    def test_changed_base_class_invalidates_flow(self):
+        self.write_module('base.py', '''\
+        from nagini import BaseJob
+
+
+        class MyBase(BaseJob):
+            retries = 1
+        ''')
+        self.write_module('jobs.py', '''\
+        from {project}.base import MyBase
+
+
+        class SecondJob(MyBase):
+            pass
+        '''.format(project=self.name))
+        self.build(cache=self.make_cache())
+        self.write_module('base.py', '''\
+        from nagini import BaseJob
+
+
+        class MyBase(BaseJob):
+            retries = 5
+        ''')
+        package = self.build(cache=self.make_cache())
+
+        self.assertIn('retries=5',
+                      self.read_generated(package, 'SecondJob.job'))
+
+    def test_changed_imported_module_invalidates_flow(self):
+        self.write_module('names.py', '''\
+        JOB_NAME = 'first'
+        ''')
+        self.write_module('flows.py', '''\
+        from nagini import BaseFlow, BaseJob
+        from {project}.names import JOB_NAME
+
+
+        class NamedJob(BaseJob):
+            name = JOB_NAME
+
+
+        class TestFlow(BaseFlow):
+            def requires(self):
+                return NamedJob()
+        '''.format(project=self.name))
+        self.build(cache=self.make_cache())
+        self.write_module('names.py', '''\
+        JOB_NAME = 'second'
+        ''')
+        package = self.build(cache=self.make_cache())
+
+        self.assertIn('dependencies=second',
+                      self.read_generated(package, 'TestFlow.job'))
+
+    def test_cache_is_dropped_on_key_change(self):
+        self.build(cache=self.make_cache())
+        cache = self.make_cache()
+        cache.key = dict(cache.key, nagini='0.0')
+        cache._load()
+        self.assertEqual(cache.modules, {})
+
+
+class ParallelBuildTest(BuilderTestCase):
+    def test_build_projects_in_workers(self):
+        projects = build_projects([self.project_path, self.project_path],
+                                  jobs=2)
+        self.packages.extend(projects)
+
+        self.assertEqual([p.name for p in projects], [self.name, self.name])
+        for project in projects:
+            self.assertTrue(zipfile.is_zipfile(project.zip_path))
+            self.assertIn('TestFlow.job',
+                          zipfile.ZipFile(project.zip_path).namelist())
+        self.assertNotIn(self.name + '.flows', sys.modules)
+
+
+class StaticDiscoveryTest(BuilderTestCase):
+    def test_modules_without_flows_are_not_imported(self):
+        self.write_module('heavy.py', '''\
+        import some_heavy_dependency
+        ''')
+        package = self.build(static=True)
+
+        self.assertNotIn(self.name + '.heavy', sys.modules)
+        self.assertIn('dependencies=SecondJob',
+                      self.read_generated(package, 'TestFlow.job'))
+
+
+class DiamondTop(BaseJob):
+    pass
+
+
+class DiamondLeft(BaseJob):
+    def requires(self):
+        return DiamondTop()
+
+
+class DiamondRight(BaseJob):
+    def requires(self):
+        return [DiamondTop(), DiamondTop()]
+
+
+class DiamondBottom(BaseJob):
+    def requires(self):
+        return [DiamondLeft(), DiamondRight()]
+
+
+class DiamondFlow(BaseFlow):
+    def requires(self):
+        return [DiamondBottom(), DiamondLeft()]
+
+
+class FakeProject(object):
+    name = 'fake'
+    profiler = Profiler(enabled=False)
+
+    def __init__(self):
+        self.base_dir = tempfile.gettempdir()
+        self.written = []
+        self.jobs = {}
+
+    def write_file(self, filename, content, source_files=()):
+        self.written.append(filename)
+
+    def register_job(self, name, import_path, class_name, source_files=()):
+        self.jobs[name] = '%s:%s' % (import_path, class_name)
+
+
+class FlowWrapperTest(unittest.TestCase):
+    def test_shared_jobs_are_built_once(self):
+        project = FakeProject()
+        wrapper = FlowWrapper(DiamondFlow, project)
+        wrapper.build()
+
+        self.assertEqual(sorted(set(project.written)), sorted(project.written))
+        self.assertIn('DiamondTop.job', project.written)
+        right = wrapper.flow._wrappers[DiamondRight]
+        self.assertEqual([d.name for d in right.dependencies], ['DiamondTop'])
+
+
+class ProjectArchiveTest(BuilderTestCase):
+    def test_archive_content(self):
+        self.write_module('data.gz', 'compressed data')
+        package = self.build()
+        archive = zipfile.ZipFile(package.zip_path)
+
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read(self.name + '/jobs.py'),
+                         dedent(JOBS_MODULE))
+        self.assertEqual(archive.getinfo(self.name + '/data.gz').compress_type,
+                         zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo(self.name + '/jobs.py').compress_type,
+                         zipfile.ZIP_DEFLATED)
+        self.assertIn('NaginiLauncher.py', archive.namelist())
+        self.assertFalse([n for n in archive.namelist()
+                          if n.endswith('FlowLauncher.py')])
+        self.assertEqual(json.loads(archive.read('nagini_jobs.json')), {
+            'FirstJob': self.name + '.jobs:FirstJob',
+            'SecondJob': self.name + '.jobs:SecondJob',
+            'TestFlow': self.name + '.flows:TestFlow',
+        })
+        self.assertIn('command=python NaginiLauncher.py SecondJob',
+                      archive.read('SecondJob.job'))
+        self.assertFalse([n for n in archive.namelist() if n.endswith('.pyc')])
+
+
+class UploadManifestTest(BuilderTestCase):
+    def test_digest_ignores_timestamps(self):
+        first = self.build(config={'server': {'host': 'localhost'}})
+        self.write_module('jobs.py', JOBS_MODULE)  # touch
+        second = self.build(config={'server': {'host': 'localhost'}})
+        self.assertEqual(zip_digest(first.zip_path),
+                         zip_digest(second.zip_path))
+
+        self.write_module('jobs.py', JOBS_MODULE + '\n')
+        third = self.build(config={'server': {'host': 'localhost'}})
+        self.assertNotEqual(zip_digest(first.zip_path),
+                            zip_digest(third.zip_path))
+
+    def test_manifest(self):
+        manifest = UploadManifest(join(self.root, 'cache'), 'host')
+        self.assertFalse(manifest.is_uploaded('project', 'digest'))
+        manifest.set_uploaded('project', 'digest')
+
+        manifest = UploadManifest(join(self.root, 'cache'), 'host')
+        self.assertTrue(manifest.is_uploaded('project', 'digest'))
+        self.assertFalse(manifest.is_uploaded('project', 'other'))
+        manifest = UploadManifest(join(self.root, 'cache'), 'other host')
+        self.assertFalse(manifest.is_uploaded('project', 'digest'))
+
+
+class ProfilerTest(BuilderTestCase):
+    def test_build_phases(self):
+        profiler = Profiler()
+        self.build(profiler=profiler)
+        phases = profiler.phases[self.name]
+
+        for phase in ('discover', 'import', 'dag', 'render', 'zip'):
+            self.assertIn(phase, phases)
+        self.assertIn(self.name + '/flows.py', profiler.imports[self.name])
+        self.assertEqual(len(profiler.to_dict()['slowest_imports']), 2)
@@ -0,0 +1,262 @@
+# -*- coding: utf8 -*-
+from benchmarks.fake_azkaban import FakeAzkaban
+from requests.packages.urllib3.exceptions import (ConnectTimeoutError,
+                                                  MaxRetryError)
+from nagini.client import AzkabanClient, FETCH_ERROR
+from nagini.multipart import MultipartEncoder
+import nagini.client
+from threading import Lock
+import tempfile
+import unittest
+import requests
+import time
+import os
+
+
+class FakeClient(AzkabanClient):
+    """Client which returns next status from the list on every poll"""
+
+    def __init__(self, statuses):
+        super(FakeClient, self).__init__('http://localhost')
+        self.statuses = statuses
+        self.polls = dict((exec_id, 0) for exec_id in statuses)
+        self.lock = Lock()
+
+    def get_execution_info(self, exec_id):
+        with self.lock:
+            n = self.polls[exec_id]
+            self.polls[exec_id] += 1
+        statuses = self.statuses[exec_id]
+        if statuses is None:
+            raise ValueError('Cannot find execution %d' % exec_id)
+        return {'execid': exec_id,
+                'status': statuses[min(n, len(statuses) - 1)]}
+
+
+class FakeResponse(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def json(self):
+        return {'status_code': self.status_code}
+
+
+class FakeSession(object):
+    """Session which returns next response or raises next error"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return FakeResponse(response)
+
+
+class RetryTest(unittest.TestCase):
+    def make_client(self, responses):
+        client = AzkabanClient('http://localhost', retry_backoff=0)
+        client.session = FakeSession(responses)
+        return client
+
+    def test_idempotent_request_is_retried(self):
+        client = self.make_client([503, requests.ConnectionError(), 200])
+        self.assertEqual(client.get_execution_info(1), {'status_code': 200})
+        self.assertEqual(client.session.calls, 3)
+
+    def test_execute_flow_is_not_retried_on_error_code(self):
+        client = self.make_client([503, 200])
+        self.assertEqual(client.execute_flow('project', 'flow'),
+                         {'status_code': 503})
+        self.assertEqual(client.session.calls, 1)
+
+    def test_execute_flow_is_retried_only_on_connect_error(self):
+        connect_timeout = requests.ConnectionError(MaxRetryError(
+            None, 'http://localhost', ConnectTimeoutError('timed out')))
+        client = self.make_client([connect_timeout, 200])
+        self.assertEqual(client.execute_flow('project', 'flow'),
+                         {'status_code': 200})
+        self.assertEqual(client.session.calls, 2)
+
+        client = self.make_client([requests.ConnectionError(), 200])
+        self.assertRaises(requests.ConnectionError, client.execute_flow,
+                          'project', 'flow')
+        self.assertEqual(client.session.calls, 1)
+
+    def test_refused_connection_is_retried(self):
+        client = AzkabanClient('http://127.0.0.1:1', retries=1,
+                               retry_backoff=0)
+        attempts = []
+        request = client.session.request
+
+        def counting_request(*args, **kwargs):
+            attempts.append(1)
+            return request(*args, **kwargs)
+
+        client.session.request = counting_request
+        self.assertRaises(requests.ConnectionError, client.execute_flow,
+                          'project', 'flow')
+        self.assertEqual(len(attempts), 2)
+
+
+class WaitForExecutionsTest(unittest.TestCase):
+    def test_wait(self):
+        client = FakeClient({
+            1: ['SUCCEEDED'],
+            2: ['PREPARING', 'RUNNING', 'RUNNING', 'FAILED'],
+        })
+        statuses = client.wait_for_executions([1, 2, 2, '1'],
+                                              poll_interval=0.01)
+        self.assertEqual(statuses, {1: 'SUCCEEDED', 2: 'FAILED'})
+        self.assertEqual(client.polls, {1: 1, 2: 4})
+
+    def test_finished_are_yielded_first(self):
+        client = FakeClient({1: ['RUNNING'] * 3 + ['KILLED'],
+                             2: ['SUCCEEDED']})
+        order = [exec_id for exec_id, _ in client.iter_finished_executions(
+            [1, 2], poll_interval=0.01)]
+        self.assertEqual(order, [2, 1])
+
+    def test_bad_id(self):
+        client = FakeClient({1: ['RUNNING', 'SUCCEEDED'], 2: None})
+        statuses = client.wait_for_executions([1, 2], poll_interval=0.01,
+                                              max_errors=2)
+        self.assertEqual(statuses, {1: 'SUCCEEDED', 2: FETCH_ERROR})
+        # First poll and 2 retries
+        self.assertEqual(client.polls[2], 3)
+
+    def test_backoff(self):
+        client = FakeClient({1: ['RUNNING']})
+        statuses = client.wait_for_executions([1], timeout=0.5,
+                                              poll_interval=0.01,
+                                              max_poll_interval=1)
+        self.assertEqual(statuses, {1: None})
+        # 0.01 + 0.02 + 0.04 + ... polls and the last one at timeout
+        self.assertLessEqual(client.polls[1], 8)
+
+
+class FlowClient(AzkabanClient):
+    """Client which counts concurrent executeFlow requests"""
+
+    def __init__(self):
+        super(FlowClient, self).__init__('http://localhost')
+        self.lock = Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def execute_flow(self, project, flow, properties=None, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if properties.get('fail'):
+            raise ValueError('failed')
+        return {'flow': flow, 'execid': properties['n'],
+                'option': kwargs['concurrentOption']}
+
+
+class ExecuteFlowsTest(unittest.TestCase):
+    def test_results_are_ordered(self):
+        client = FlowClient()
+        results = client.execute_flows(
+            'project', [('flow', {'n': n, 'fail': n == 3}) for n in range(8)],
+            max_in_flight=3, concurrentOption='skip'
+        )
+        self.assertEqual([r.get('execid') for r in results],
+                         [0, 1, 2, None, 4, 5, 6, 7])
+        self.assertEqual(results[3], {'error': 'failed',
+                                      'exception': 'ValueError'})
+        self.assertEqual(results[0]['option'], 'skip')
+        self.assertEqual(client.max_in_flight, 3)
+
+    def test_rate(self):
+        client = FlowClient()
+        start = time.time()
+        client.execute_flows('project',
+                             [('flow', {'n': n}) for n in range(6)],
+                             max_in_flight=6, rate=50, concurrentOption='skip')
+        # 6 requests are spread by 1/50 s
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+
+class FakeServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeAzkaban(log_size=100000, jobs=2).start()
+        self.client = AzkabanClient(self.server.url)
+        self.client.login('user', 'password')
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_upload(self):
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        with os.fdopen(fd, 'wb') as fo:
+            fo.write('x' * 300000)
+        try:
+            self.client.create_project('project')
+            r = self.client.upload_project_zip('project', path)
+        finally:
+            os.remove(path)
+        self.assertEqual(r['version'], 1)
+        self.assertGreater(self.server.uploaded_bytes, 300000)
+
+    def test_upload_reads_body_by_blocks(self):
+        sizes = []
+
+        class RecordingEncoder(MultipartEncoder):
+            def read(self, size=-1):
+                sizes.append(size)
+                return super(RecordingEncoder, self).read(size)
+
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        with os.fdopen(fd, 'wb') as fo:
+            fo.write('x' * 300000)
+        nagini.client.MultipartEncoder = RecordingEncoder
+        try:
+            self.client.create_project('project')
+            self.client.upload_project_zip('project', path)
+        finally:
+            nagini.client.MultipartEncoder = MultipartEncoder
+            os.remove(path)
+        # Body is never read at whole
+        self.assertGreater(len(sizes), 300000 // 8192)
+        self.assertTrue(all(0 < size <= 1 << 16 for size in sizes))
+
+    def test_execution(self):
+        self.client.create_project('project')
+        exec_id = self.client.execute_flow('project', 'flow')['execid']
+        self.server.expire_sessions()  # client must login again
+        self.assertEqual(self.client.wait_for_executions([exec_id]),
+                         {exec_id: 'SUCCEEDED'})
+        self.assertEqual(self.client.get_job_status(exec_id, 'job_1'),
+                         'SUCCEEDED')
+        log = self.client.get_job_logs(exec_id, 'job_0', page_size=30000)
+        self.assertEqual(log['data'], self.server.log(exec_id, 'job_0'))
+
+    def test_follow_log(self):
+        self.server.stop()
+        self.server = FakeAzkaban(log_size=100000, jobs=1,
+                                  execution_time=1).start()
+        self.client = AzkabanClient(self.server.url)
+        self.client.login('user', 'password')
+        self.client.create_project('project')
+        exec_id = self.client.execute_flow('project', 'flow')['execid']
+
+        start = time.time()
+        chunks = list(self.client.iter_job_logs(exec_id, 'job_0',
+                                                follow=True,
+                                                poll_interval=0.05,
+                                                max_poll_interval=0.2))
+        elapsed = time.time() - start
+        self.assertEqual(''.join(chunks), self.server.log(exec_id, 'job_0'))
+        # Log is read while it grows and polling stops when job is finished
+        self.assertGreater(len(chunks), 2)
+        self.assertGreaterEqual(elapsed, 0.9)
+        self.assertLess(elapsed, 1.5)
+        requests = self.server.requests
+        time.sleep(0.3)
+        self.assertEqual(self.server.requests, requests)
@@ -0,0 +1,97 @@
+# -*- coding: utf8 -*-
+from nagini.builder.discovery import (StaticFlowFinder, FLOW, EMBEDDED_FLOW,
+                                      JOB)
+from os.path import join, dirname
+from textwrap import dedent
+from os import makedirs
+import tempfile
+import unittest
+import shutil
+
+
+MODULES = {
+    'project/__init__.py': '',
+    'project/base.py': '''\
+        import nagini
+
+
+        class ProjectFlow(nagini.BaseFlow):
+            pass
+        ''',
+    'project/jobs/__init__.py': '''\
+        from project.jobs.heavy import HeavyJob
+        ''',
+    'project/jobs/heavy.py': '''\
+        import some_heavy_dependency
+        from nagini.job import BaseJob
+
+
+        class HeavyJob(BaseJob):
+            pass
+
+
+        class NotAJob(some_heavy_dependency.Model):
+            pass
+        ''',
+    'project/flows.py': '''\
+        from base import ProjectFlow
+        from nagini import EmbeddedFlow
+        from project import jobs
+
+
+        class MainFlow(ProjectFlow):
+            pass
+
+
+        class Embedded(EmbeddedFlow):
+            pass
+
+
+        class DerivedJob(jobs.HeavyJob):
+            pass
+        ''',
+    'project/other.py': '''\
+        from __future__ import absolute_import
+        from .flows import *
+
+
+        class OtherFlow(MainFlow):
+            pass
+        ''',
+}
+
+
+class StaticFlowFinderTest(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix='nagini-test-')
+        for path, content in MODULES.iteritems():
+            path = join(self.base_dir, path)
+            try:
+                makedirs(dirname(path))
+            except OSError:
+                pass
+            with open(path, 'w') as fd:
+                fd.write(dedent(content))
+        self.finder = StaticFlowFinder(self.base_dir).scan()
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_find_flows(self):
+        flows = self.finder.find_flows()
+        self.assertEqual(sorted(flows.keys()), ['project/base.py',
+                                                'project/flows.py',
+                                                'project/other.py'])
+        self.assertEqual(flows['project/flows.py'], ['MainFlow'])
+        self.assertEqual(flows['project/other.py'], ['OtherFlow'])
+
+    def test_kinds(self):
+        self.assertEqual(self.finder.kind('project.flows', 'Embedded'),
+                         EMBEDDED_FLOW)
+        self.assertEqual(self.finder.kind('project.flows', 'MainFlow'), FLOW)
+        self.assertEqual(self.finder.kind('project.flows', 'DerivedJob'), JOB)
+        self.assertIsNone(self.finder.kind('project.jobs.heavy', 'NotAJob'))
+
+    def test_resolve_through_package(self):
+        self.assertEqual(self.finder.resolve('project.jobs', 'HeavyJob'),
+                         ('project.jobs.heavy', 'HeavyJob'))
@@ -0,0 +1,77 @@
+# -*- coding: utf8 -*-
+from nagini.history import HistoryStore, HistoryExporter
+from os.path import join
+import tempfile
+import unittest
+import shutil
+
+
+def execution(exec_id, status='SUCCEEDED', duration=10, flow='flow'):
+    return {
+        'execid': exec_id, 'project': 'project', 'flow': flow,
+        'status': status, 'startTime': 1000, 'endTime': 1000 + duration,
+        'nodes': [
+            {'id': 'job', 'status': 'SUCCEEDED', 'startTime': 1000,
+             'endTime': 1000 + duration},
+            {'id': 'embedded', 'type': 'flow', 'status': status,
+             'startTime': 1000, 'endTime': 1000 + duration, 'nodes': [
+                 {'id': 'job', 'nestedId': 'embedded:job',
+                  'status': status, 'startTime': 1000, 'endTime': -1},
+             ]},
+        ],
+    }
+
+
+class FakeClient(object):
+    def __init__(self, executions):
+        self.executions = executions
+        self.fetched = []
+
+    def get_execution_info(self, exec_id):
+        self.fetched.append(exec_id)
+        if exec_id in self.executions:
+            return self.executions[exec_id]
+        return {'error': 'Cannot find execution %d' % exec_id}
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nagini-test-')
+        self.store = HistoryStore(join(self.dir, 'history.db'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def test_export_and_resume(self):
+        executions = dict((i, execution(i, duration=i * 1000))
+                          for i in range(1, 21) if i != 5)
+        executions[15] = execution(15, status='RUNNING')
+        client = FakeClient(executions)
+        exporter = HistoryExporter(client, self.store, workers=4,
+                                   batch_size=7)
+        self.assertEqual(exporter.export(max_missing=10), 18)
+        # Missing 5 is skipped, running 15 must be fetched again
+        self.assertEqual(self.store.last_exec_id, 14)
+        self.assertEqual(self.store.connection.execute(
+            'SELECT COUNT(*) FROM jobs').fetchone()[0], 18 * 3)
+
+        executions[15] = execution(15)
+        client.fetched = []
+        self.assertEqual(exporter.export(max_missing=10), 6)
+        self.assertEqual(min(client.fetched), 15)
+        self.assertEqual(self.store.last_exec_id, 20)
+
+    def test_job_durations(self):
+        self.store.add([execution(i, duration=i * 1000)
+                        for i in range(1, 101)])
+        self.store.add([execution(i, duration=1000, flow='other')
+                        for i in range(101, 111)])
+        rows = self.store.job_durations()
+        # Jobs of different flows and embedded flow nodes are not mixed
+        self.assertEqual(rows, [('project', 'flow', 'job', 100, 50.0, 95.0,
+                                 100.0),
+                                ('project', 'other', 'job', 10, 1.0, 1.0,
+                                 1.0)])
+        self.assertEqual(len(self.store.job_durations(status=None)), 2)
+        self.assertEqual(self.store.job_durations(since=2000), [])
@@ -0,0 +1,131 @@
+# -*- coding: utf8 -*-
+from nagini.job import BaseJob, IntervalDataChecker
+from nagini.target import LocalTarget, MySqlTarget
+from nagini.properties import props
+from dateutil.rrule import DAILY
+from os.path import join, exists
+import tempfile
+import unittest
+import shutil
+
+
+class FakeFlow(object):
+    """Records starts of flow instead of calling Azkaban"""
+    started = []
+    fail = False
+
+    @classmethod
+    def start(cls, properties=None, concurrent_option="skip"):
+        cls.started.append(properties["day"])
+
+    @classmethod
+    def start_many(cls, properties_list, concurrent_option="skip",
+                   max_in_flight=10, rate=None):
+        result = []
+        for properties in properties_list:
+            cls.started.append(properties["day"])
+            if cls.fail:
+                result.append({"error": "failed", "exception": "ValueError"})
+            else:
+                result.append({"error": "Flow is already running"})
+        return result
+
+
+class Checker(IntervalDataChecker):
+    type = DAILY
+    check_interval = 3
+    work_flow = FakeFlow
+
+    def src_data_exists(self, s, e):
+        return True
+
+    def dst_data_exists(self, s, e):
+        return False
+
+
+class CustomChecker(Checker):
+    custom_starts = []
+
+    def start_work_flow(self, s, e):
+        self.custom_starts.append(s)
+
+
+class IntervalDataCheckerTest(unittest.TestCase):
+    def setUp(self):
+        self.saved_props = dict(props)
+        props.clear()
+        FakeFlow.started = []
+        FakeFlow.fail = False
+        CustomChecker.custom_starts = []
+
+    def tearDown(self):
+        props.clear()
+        props.update(self.saved_props)
+
+    def test_periods_are_started_at_once(self):
+        Checker().run()
+        # Error responses of server are only logged
+        self.assertEqual(len(FakeFlow.started), 4)
+
+    def test_overridden_start_work_flow(self):
+        CustomChecker().run()
+        self.assertEqual(len(CustomChecker.custom_starts), 4)
+        self.assertEqual(FakeFlow.started, [])
+
+    def test_failed_submissions(self):
+        FakeFlow.fail = True
+        self.assertRaises(Exception, Checker().run)
+        self.assertEqual(len(FakeFlow.started), 4)
+
+
+class FailingConnection(object):
+    queries = 0
+
+    def query(self, sql):
+        FailingConnection.queries += 1
+        raise IOError('Can not connect to MySQL server')
+
+
+class UnreachableTarget(MySqlTarget):
+    def connection(self):
+        return FailingConnection()
+
+
+class DroppedTarget(UnreachableTarget):
+    """Target which clean_up requires existence check"""
+    clean_up_requires_exists = True
+
+
+class FailedJob(BaseJob):
+    def output(self):
+        return [UnreachableTarget('table'), DroppedTarget('other'),
+                LocalTarget(join(props['working.dir'], 'output'))]
+
+    def run(self):
+        with self.output()[2].open('w') as fd:
+            fd.write('partial')
+        raise ValueError('original failure')
+
+
+class OnFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.saved_props = dict(props)
+        self.dir = tempfile.mkdtemp(prefix='nagini-test-')
+        with open(join(self.dir, 'config.yml'), 'w') as fd:
+            fd.write('project: test\n')
+        props.clear()
+        props['working.dir'] = self.dir
+        FailingConnection.queries = 0
+
+    def tearDown(self):
+        props.clear()
+        props.update(self.saved_props)
+        shutil.rmtree(self.dir)
+
+    def test_original_exception_is_raised(self):
+        with self.assertRaises(ValueError) as context:
+            FailedJob().execute()
+        self.assertEqual(str(context.exception), 'original failure')
+        # Only target which clean_up requires existence is checked
+        self.assertEqual(FailingConnection.queries, 1)
+        self.assertFalse(exists(join(self.dir, 'output')))
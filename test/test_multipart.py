@@ -0,0 +1,57 @@
+# -*- coding: utf8 -*-
+from nagini.multipart import MultipartEncoder
+from tempfile import NamedTemporaryFile
+from StringIO import StringIO
+import unittest
+import cgi
+
+
+class MultipartEncoderTest(unittest.TestCase):
+    def setUp(self):
+        self.file = NamedTemporaryFile()
+        self.content = ''.join(chr(i % 256) for i in xrange(100000))
+        self.file.write(self.content)
+        self.file.flush()
+        self.fd = open(self.file.name, 'rb')
+
+    def tearDown(self):
+        self.fd.close()
+        self.file.close()
+
+    def make_encoder(self):
+        return MultipartEncoder(
+            fields={'ajax': 'upload', 'project': u'проект'},
+            files={'file': ('project.zip', self.fd, 'application/zip')}
+        )
+
+    def parse(self, encoder, body):
+        environ = {'REQUEST_METHOD': 'POST',
+                   'CONTENT_TYPE': encoder.content_type,
+                   'CONTENT_LENGTH': str(len(body))}
+        return cgi.FieldStorage(StringIO(body), environ=environ)
+
+    def test_body(self):
+        encoder = self.make_encoder()
+        body = ''.join(iter(lambda: encoder.read(777), ''))
+
+        self.assertEqual(len(body), len(encoder))
+        form = self.parse(encoder, body)
+        self.assertEqual(form['ajax'].value, 'upload')
+        self.assertEqual(form['project'].value, 'проект')
+        self.assertEqual(form['file'].filename, 'project.zip')
+        self.assertEqual(form['file'].value, self.content)
+
+    def test_rewind(self):
+        encoder = self.make_encoder()
+        first = ''.join(iter(lambda: encoder.read(1000), ''))
+        encoder.seek(0)
+        self.assertEqual(encoder.read(), first)
+        self.assertEqual(encoder.tell(), len(encoder))
+
+        encoder.seek(0)
+        encoder.read(1000)
+        encoder.seek(0, 2)
+        self.assertEqual(encoder.tell(), len(encoder))
+        self.assertEqual(encoder.read(), '')
+        encoder.seek(0)
+        self.assertEqual(encoder.read(), first)
@@ -0,0 +1,37 @@
+# -*- coding: utf8 -*-
+from nagini.properties import Properties, LazyJson
+import tempfile
+import unittest
+import json
+import os
+
+
+class PropertiesTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(prefix='nagini-test-')
+        with os.fdopen(fd, 'w') as fo:
+            fo.write('a=1\nb=2\nurl=http\\://host\n')
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_diff(self):
+        props = Properties()
+        props.load(self.filename)
+        self.assertEqual(props['url'], 'http://host')
+        self.assertEqual(props.diff(), {})
+
+        props['a'] = '10'
+        props['c'] = '3'
+        del props['b']
+        self.assertEqual(props.diff(), {'a': '10', 'c': '3', 'b': None})
+
+    def test_lazy_json(self):
+        data = {'short': 'x', 'long': 'y' * 1000, 'text': u'тест'}
+        lazy = LazyJson(data, max_value_size=10)
+        data['added'] = 1  # serialized when formatted, not when created
+        result = json.loads(str(lazy))
+        self.assertEqual(result['long'], 'y' * 10 + '... (1000 chars)')
+        self.assertEqual(result['text'], u'тест')
+        self.assertEqual(result['added'], 1)
+        self.assertEqual(json.loads(str(LazyJson(data)))['long'], 'y' * 1000)
@@ -0,0 +1,168 @@
+# -*- coding: utf8 -*-
+from nagini.runner import LocalRunner, JobFailed, build_dag
+from nagini.ledger import CompletionLedger, LEDGER_FILENAME
+from nagini.properties import props
+from nagini import BaseJob, LocalTarget
+from os.path import join
+import tempfile
+import unittest
+import shutil
+import json
+import time
+import os
+
+
+class RunnerJob(BaseJob):
+    requirements = ()
+    fail = False
+
+    def requires(self):
+        return [cls() for cls in self.requirements]
+
+    def output(self):
+        return LocalTarget(join(props['working.dir'],
+                                self.__class__.__name__ + '.json'))
+
+    def run(self):
+        name = self.__class__.__name__
+        start = time.time()
+        time.sleep(0.2)
+        with self.output().open('w') as fd:
+            json.dump({'start': start, 'end': time.time(),
+                       'props': sorted(k for k in props
+                                       if k.startswith('from.'))}, fd)
+        if self.fail or os.path.exists(join(props['working.dir'], 'fail')):
+            raise ValueError('failed')
+        props['from.' + name] = '1'
+
+
+class Root(RunnerJob):
+    pass
+
+
+class Left(RunnerJob):
+    requirements = (Root,)
+
+
+class Right(RunnerJob):
+    requirements = (Root,)
+
+
+class Last(RunnerJob):
+    requirements = (Left, Right, Root)
+
+
+class FailedRight(RunnerJob):
+    requirements = (Root,)
+    fail = True
+
+
+class AfterFailed(RunnerJob):
+    requirements = (Left, FailedRight)
+
+
+class Killed(RunnerJob):
+    requirements = (Root,)
+
+    def run(self):
+        os._exit(3)  # like process killed by OOM killer
+
+
+class AfterKilled(RunnerJob):
+    requirements = (Killed,)
+
+
+class Cycle(RunnerJob):
+    pass
+
+
+Cycle.requirements = (Cycle,)
+
+
+class LocalRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nagini-test-')
+        with open(join(self.dir, 'config.yml'), 'w') as fd:
+            fd.write('project: test\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def result(self, name):
+        with open(join(self.dir, name + '.json')) as fd:
+            return json.load(fd)
+
+    def test_build_dag(self):
+        order, parents = build_dag(Last())
+        self.assertEqual(order[0], Root)
+        self.assertEqual(order[-1], Last)
+        self.assertEqual(len(order), 4)
+        self.assertEqual(parents[Last], [Left, Right, Root])
+        self.assertRaises(ValueError, build_dag, Cycle())
+
+    def test_run(self):
+        LocalRunner(Last(), workers=2, working_dir=self.dir).run()
+        self.assertEqual(len([f for f in os.listdir(self.dir)
+                              if f.endswith('.json') and f[0] != '.']), 4)
+        # Props are passed along edges
+        self.assertEqual(self.result('Left')['props'], ['from.Root'])
+        self.assertEqual(self.result('Last')['props'],
+                         ['from.Left', 'from.Right', 'from.Root'])
+        # Independent jobs are executed concurrently
+        left, right = self.result('Left'), self.result('Right')
+        self.assertLess(max(left['start'], right['start']),
+                        min(left['end'], right['end']))
+
+    def test_failure(self):
+        runner = LocalRunner(AfterFailed(), workers=2, working_dir=self.dir)
+        self.assertRaises(JobFailed, runner.run)
+        shutil.rmtree(runner.props_dir)
+        self.assertFalse(os.path.exists(join(self.dir, 'AfterFailed.json')))
+
+    def test_killed_process(self):
+        runner = LocalRunner(AfterKilled(), working_dir=self.dir)
+        start = time.time()
+        with self.assertRaises(JobFailed) as context:
+            runner.run()
+        shutil.rmtree(runner.props_dir)
+        self.assertLess(time.time() - start, 5)
+        self.assertIn('Killed', str(context.exception))
+        self.assertTrue(os.path.exists(join(self.dir, 'Root.json')))
+        self.assertFalse(os.path.exists(join(self.dir, 'AfterKilled.json')))
+
+    def test_resume(self):
+        fail = join(self.dir, 'fail')
+        open(fail, 'w').close()
+        runner = LocalRunner(Last(), working_dir=self.dir)
+        self.assertRaises(JobFailed, runner.run)
+        shutil.rmtree(runner.props_dir)
+        os.remove(fail)
+        ledger = CompletionLedger(join(self.dir, LEDGER_FILENAME))
+        self.assertIsNone(ledger.get(Root))  # failed job is not recorded
+
+        LocalRunner(Last(), workers=2, working_dir=self.dir).run()
+        first = dict((name, self.result(name)['start'])
+                     for name in ('Root', 'Left', 'Right', 'Last'))
+
+        os.remove(join(self.dir, 'Right.json'))
+        LocalRunner(Last(), workers=2, working_dir=self.dir,
+                    resume=True).run()
+        # Root and Left are skipped, Right is lost, Last requires it
+        self.assertEqual(self.result('Root')['start'], first['Root'])
+        self.assertEqual(self.result('Left')['start'], first['Left'])
+        self.assertNotEqual(self.result('Right')['start'], first['Right'])
+        self.assertNotEqual(self.result('Last')['start'], first['Last'])
+        # Props of skipped jobs are passed to the next jobs
+        self.assertEqual(self.result('Last')['props'],
+                         ['from.Left', 'from.Right', 'from.Root'])
+
+    def test_entry_is_dropped_on_rerun(self):
+        LocalRunner(Last(), working_dir=self.dir).run()
+        open(join(self.dir, 'fail'), 'w').close()
+        runner = LocalRunner(Last(), working_dir=self.dir)
+        self.assertRaises(JobFailed, runner.run)
+        shutil.rmtree(runner.props_dir)
+        # Root is executed again and failed, its old entry must not be used
+        ledger = CompletionLedger(join(self.dir, LEDGER_FILENAME))
+        self.assertIsNone(ledger.get(Root))
+        self.assertIsNotNone(ledger.get(Last))
@@ -0,0 +1,37 @@
+# -*- coding: utf8 -*-
+from nagini.session import SessionCache
+from os.path import join
+import tempfile
+import unittest
+import shutil
+
+
+class SessionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nagini-test-')
+        self.filename = join(self.dir, 'session.json')
+        SessionCache._memory.clear()
+
+    def tearDown(self):
+        SessionCache._memory.clear()
+        shutil.rmtree(self.dir)
+
+    def test_memory_cache(self):
+        SessionCache().set('host', 'user', 'id')
+        self.assertEqual(SessionCache().get('host', 'user'), 'id')
+        self.assertIsNone(SessionCache().get('host', 'other'))
+
+    def test_file_cache_is_shared_between_processes(self):
+        SessionCache(self.filename).set('host', 'user', 'id')
+        SessionCache._memory.clear()  # like another process
+        self.assertEqual(SessionCache(self.filename).get('host', 'user'),
+                         'id')
+
+    def test_invalidate(self):
+        cache = SessionCache(self.filename)
+        cache.set('host', 'user', 'id')
+        cache.invalidate('host', 'user', 'other id')
+        self.assertEqual(cache.get('host', 'user'), 'id')
+
+        cache.invalidate('host', 'user', 'id')
+        self.assertIsNone(cache.get('host', 'user'))
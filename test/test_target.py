@@ -0,0 +1,156 @@
+# -*- coding: utf8 -*-
+from nagini.target import Target, LocalTarget, MySqlTarget, targets_exist
+from os.path import join
+import tempfile
+import unittest
+import shutil
+import re
+import os
+
+
+class CountingTarget(Target):
+    bulk_calls = []
+
+    def __init__(self, exists):
+        self._exists = exists
+
+    def exists(self):
+        return self._exists
+
+    def clean_up(self):
+        pass
+
+    @classmethod
+    def exists_many(cls, targets):
+        cls.bulk_calls.append(len(targets))
+        return super(CountingTarget, cls).exists_many(targets)
+
+
+class NonEmptyTarget(LocalTarget):
+    def exists(self):
+        return super(NonEmptyTarget, self).exists() and \
+            os.path.getsize(self.path) > 0
+
+
+class ExistsManyTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nagini-test-')
+        CountingTarget.bulk_calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_local_target(self):
+        for n in range(0, 20, 2):
+            open(join(self.dir, '%d.csv' % n), 'w').close()
+        targets = [LocalTarget(join(self.dir, '%d.csv' % n))
+                   for n in range(20)]
+        targets.append(LocalTarget(join(self.dir, 'missing', 'a.csv')))
+        targets.append(LocalTarget(self.dir + '/'))
+        expected = [n % 2 == 0 for n in range(20)] + [False, True]
+        self.assertEqual(LocalTarget.exists_many(targets), expected)
+        self.assertEqual([t.exists() for t in targets], expected)
+
+    def test_overridden_exists(self):
+        for n in range(20):
+            with open(join(self.dir, '%d.csv' % n), 'w') as fd:
+                fd.write('data' if n % 2 else '')
+        targets = [NonEmptyTarget(join(self.dir, '%d.csv' % n))
+                   for n in range(20)]
+        self.assertEqual(targets_exist(targets),
+                         [n % 2 == 1 for n in range(20)])
+
+    def test_grouping_by_type(self):
+        path = join(self.dir, 'file')
+        open(path, 'w').close()
+        targets = [CountingTarget(True), LocalTarget(path),
+                   CountingTarget(False), LocalTarget(path + '.missing'),
+                   CountingTarget(True)]
+        self.assertEqual(targets_exist(targets),
+                         [True, True, False, False, True])
+        self.assertEqual(CountingTarget.bulk_calls, [3])
+        self.assertEqual(targets_exist([]), [])
+
+
+class FakeConnection(object):
+    """Answers queries of MySqlTarget from dicts"""
+    tables = {('db', 'loaded'), ('db', 'empty'), ('other', 'loaded')}
+    # (table, marker) -> number of rows
+    rows = {('`db`.`loaded`', None): 5, ('`db`.`loaded`', "dt = '1'"): 2,
+            ('`other`.`loaded`', None): 1}
+    rows_re = re.compile(r"SELECT (\d+), \(SELECT COUNT\(\*\) FROM \(SELECT 1 "
+                         r"FROM (\S+)(?: WHERE (.*?))? LIMIT (\d+)\) t\)")
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, sql):
+        self.queries.append(sql)
+        if sql == 'SELECT DATABASE()':
+            return [('db',)]
+        if 'information_schema' in sql:
+            return [t for t in self.tables
+                    if "'%s' AND TABLE_NAME = '%s'" % t in sql]
+        return [(i, min(self.rows.get((table, marker or None), 0), int(limit)))
+                for i, table, marker, limit in self.rows_re.findall(sql)]
+
+
+class FakeMySqlTarget(MySqlTarget):
+    fake_connection = None
+
+    def connection(self):
+        return self.fake_connection
+
+
+class PartitionTarget(FakeMySqlTarget):
+    """Table exists and partition is registered in the other table"""
+    partitions = set()
+
+    def exists(self):
+        return super(PartitionTarget, self).exists() and \
+            self.table in self.partitions
+
+
+class MySqlTargetTest(unittest.TestCase):
+    def setUp(self):
+        FakeMySqlTarget.clear_cache()
+        FakeMySqlTarget.fake_connection = FakeConnection()
+
+    def test_exists_many(self):
+        targets = [
+            FakeMySqlTarget('loaded', db='db'),
+            FakeMySqlTarget('missing', db='db'),
+            FakeMySqlTarget('empty', db='db', min_rows=1),
+            FakeMySqlTarget('loaded', db='db', min_rows=5),
+            FakeMySqlTarget('loaded', db='db', min_rows=6),
+            FakeMySqlTarget('loaded', db='db', marker="dt = '1'"),
+            FakeMySqlTarget('loaded', db='db', marker="dt = '2'"),
+            FakeMySqlTarget('other.loaded'),
+        ]
+        self.assertEqual(targets_exist(targets), [True, False, False, True,
+                                                  False, True, False, True])
+        # Tables and rows of all targets are checked by one query each
+        self.assertEqual(len(FakeMySqlTarget.fake_connection.queries), 2)
+
+    def test_overridden_exists(self):
+        PartitionTarget.partitions = {'loaded'}
+        targets = [PartitionTarget('loaded'), PartitionTarget('empty'),
+                   PartitionTarget('missing')]
+        self.assertEqual(targets_exist(targets), [True, False, False])
+
+    def test_cache(self):
+        connection = FakeMySqlTarget.fake_connection
+        loaded = FakeMySqlTarget('loaded', min_rows=1)
+        self.assertTrue(loaded.exists())
+        queries = len(connection.queries)
+        self.assertTrue(FakeMySqlTarget('loaded', min_rows=1).exists())
+        self.assertEqual(len(connection.queries), queries)
+
+        # Missing targets are not cached, they may be created by job
+        self.assertFalse(FakeMySqlTarget('new').exists())
+        connection.tables = connection.tables | {('db', 'new')}
+        self.assertTrue(FakeMySqlTarget('new').exists())
+
+        loaded.clean_up()
+        self.assertTrue(loaded.exists())
+        self.assertGreater(len(connection.queries), queries + 3)
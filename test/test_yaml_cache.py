@@ -0,0 +1,47 @@
+# -*- coding: utf8 -*-
+from nagini.yaml_cache import load_yaml, clear
+from nagini.yaml_config import YamlConfig
+from os.path import join
+import tempfile
+import unittest
+import shutil
+
+
+class YamlCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='nagini-test-')
+        self.filename = join(self.dir, 'config.yml')
+        self.write('server:\n  host: localhost\n')
+
+    def tearDown(self):
+        clear()
+        shutil.rmtree(self.dir)
+
+    def write(self, content):
+        with open(self.filename, 'w') as fd:
+            fd.write(content)
+
+    def test_cache(self):
+        config = load_yaml(self.filename)
+        self.assertEqual(config, {'server': {'host': 'localhost'}})
+        self.assertIs(load_yaml(self.filename), config)
+
+        self.write('server:\n  host: remote\n')
+        self.assertEqual(load_yaml(self.filename),
+                         {'server': {'host': 'remote'}})
+
+    def test_dumped_strings(self):
+        self.write("name: !!python/unicode 'project'\n"
+                   "path: !!python/str 'path'\n")
+        self.assertEqual(load_yaml(self.filename),
+                         {'name': u'project', 'path': 'path'})
+
+    def test_unsafe_tags(self):
+        self.write("cmd: !!python/object/apply:os.system ['true']\n")
+        self.assertRaises(Exception, load_yaml, self.filename)
+
+    def test_yaml_config_is_mutable_copy(self):
+        config = YamlConfig(self.filename)
+        config.set('server/host', 'remote')
+        self.assertEqual(load_yaml(self.filename),
+                         {'server': {'host': 'localhost'}})